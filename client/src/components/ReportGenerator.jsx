@@ -41,14 +41,17 @@ const ReportGenerator = ({ analysisData }) => {
     const generateReport = async () => {
         setGenerating(true);
         try {
-            const payload = {
+            const report = {
                 patient_info: patientInfo,
                 tumor_info: {
                     detected: analysisData.probability > 0.5,
                     probability: analysisData.probability,
                     size: tumorSize,
                     location: analysisData.probability > 0.5 ? 'Frontal lobe' : 'N/A'
-                },
+                }
+            };
+            const payload = {
+                ...report,
                 images: {
                     original: analysisData.processed_image,
                     tumor: analysisData.tumor_image
@@ -56,12 +59,25 @@ const ReportGenerator = ({ analysisData }) => {
                 plot_3d: analysisData.plot_3d
             };
 
-            const response = await axios.post(
+            const postReport = (body) => axios.post(
                 'http://localhost:5000/api/generate-report',
-                payload,
+                body,
                 { responseType: 'blob' }
             );
 
+            // Reference the images the server kept from /analyze; re-upload them only if they expired
+            let response;
+            if (analysisData.artifacts) {
+                try {
+                    response = await postReport({ ...report, artifacts: analysisData.artifacts });
+                } catch (error) {
+                    if (error.response?.status !== 404) throw error;
+                }
+            }
+            if (!response) {
+                response = await postReport(payload);
+            }
+
             const blob = new Blob([response.data], { type: 'text/html' });
             const downloadUrl = window.URL.createObjectURL(blob);
             const link = document.createElement('a');
@@ -288,7 +304,7 @@ const ReportGenerator = ({ analysisData }) => {
                                     <div className="aspect-square bg-gray-200 rounded-lg flex items-center justify-center overflow-hidden shadow-sm hover:shadow-md transition-shadow duration-200">
                                         {analysisData?.processed_image ? (
                                             <motion.img
-                                                src={`data:image/png;base64,${analysisData.processed_image}`}
+                                                src={`data:${analysisData.encoding?.content_type || 'image/png'};base64,${analysisData.processed_image}`}
                                                 alt="Original MRI Scan"
                                                 className="w-full h-full object-cover"
                                                 whileHover={{ scale: 1.05 }}
@@ -305,7 +321,7 @@ const ReportGenerator = ({ analysisData }) => {
                                     <div className="aspect-square bg-gray-200 rounded-lg flex items-center justify-center overflow-hidden shadow-sm hover:shadow-md transition-shadow duration-200">
                                         {analysisData?.tumor_image ? (
                                             <motion.img
-                                                src={`data:image/png;base64,${analysisData.tumor_image}`}
+                                                src={`data:${analysisData.encoding?.content_type || 'image/png'};base64,${analysisData.tumor_image}`}
                                                 alt="Tumor Detection"
                                                 className="w-full h-full object-cover"
                                                 whileHover={{ scale: 1.05 }}
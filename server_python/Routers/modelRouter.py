@@ -1,35 +1,60 @@
 from flask import Blueprint,jsonify,request
-import numpy as np
-from model import diabetesModel,stressModel,sepsiModel, sepsisScaler
-import pandas as pd
+from model import registry
+from batch import BatchFormatError, to_columns
+from schema import SCHEMAS, DIABETES, STRESS, SEPSIS, ValidationError
+from scoring import BATCH_MODELS, SEPSIS_PREFILTER, score_columns
+from cache import ResultCache
+from metrics import REGISTRY, stage
+from log import get_logger, log_event
+import logging
+import config
 
 modelRouter = Blueprint('modelRouter',__name__)
+logger = get_logger('model')
 
-@modelRouter.route('/diabetes',methods=['POST'])
-def get_diabetes_model():
-    try:
-        data = request.json
-        features = []
-        keys = ['Pregnancies','Glucose','BloodPressure','SkinThickness','Insulin','BMI','DiabetesPedigreeFunction','Age']
+#⁡⁣⁣⁢Predictions keyed on (model, model version, ordered features)⁡
+result_cache = ResultCache(config.RESULT_CACHE_SIZE, config.RESULT_CACHE_TTL)
+registry.add_reload_listener(lambda name: result_cache.clear())
+REGISTRY.gauge('medisense_result_cache_hits', 'Tabular result cache hits.', function=lambda: result_cache.hits)
+REGISTRY.gauge('medisense_result_cache_misses', 'Tabular result cache misses.', function=lambda: result_cache.misses)
 
-        #⁡⁣⁣⁢Accessing all features⁡
-        for feature in keys:
-            value = int(data.get(feature))
-            if value is None:
-                raise ValueError(f'Missing value for {feature}')
-            features.append(value)
 
-        print("Received Features:", features)
+@modelRouter.route('/cache',methods=['GET'])
+def get_cache_stats():
+    return jsonify(result_cache.stats()),200
 
-        #⁡⁣⁣⁢Make Prediction⁡
-        prediction = diabetesModel.predict([features])
+def _validated_row(schema):
+    """The request body as a (1, n_features) matrix; raises ValidationError with field-level errors."""
+    return schema.validate(request.get_json(silent=True))
 
-        print("IsDiabetes : ",prediction)
+def _invalid(e):
+    return jsonify({'message' : 'Invalid input','errors' : e.errors}),400
 
-        return jsonify({'message' : "Response OK",'prediction' : bool(prediction == 1)}),200
 
-    except Exception as e:
-        print('Error at diabetes model controller : ',str(e))
+@modelRouter.route('/diabetes',methods=['POST'])
+def get_diabetes_model():
+    try:
+        #⁡⁣⁣⁢Validate and convert all features in one pass⁡
+        features = _validated_row(DIABETES)
+
+        #⁡⁣⁣⁢Make Prediction⁡
+        diabetesModel, version = registry.get_versioned('diabetes')
+        cache_key = ('diabetes', version, tuple(features[0].tolist()))
+        hit, is_diabetic = result_cache.get(cache_key)
+        if not hit:
+            with stage('predict', 'diabetes'), registry.timed('diabetes', version):
+                prediction = diabetesModel.predict(features)
+            is_diabetic = bool(prediction[0] == 1)
+            result_cache.put(cache_key, is_diabetic)
+
+        log_event(logger, 'prediction', logging.DEBUG, model='diabetes', features=features[0].tolist(), prediction=is_diabetic, cached=hit)
+
+        return jsonify({'message' : "Response OK",'prediction' : is_diabetic}),200
+
+    except ValidationError as e:
+        return _invalid(e)
+    except Exception:
+        logger.exception('Error at diabetes model controller')
         return jsonify({'message' : "Internal Server Error"}),500
 
 
@@ -38,77 +63,86 @@ def get_diabetes_model():
 def get_stress_model():
 
     try:
-        data = request.json
-        print(data)
-
-        features = []
-
-        feature_keys = ['Education', 'Gender', 'Engnat', 'Age', 'Married', 'Familysize', 'stress_sum']
-
-        #⁡⁣⁣⁢Accessing all features⁡
-        for key in feature_keys:
-            value = int(data.get(key))
-
-            if(value is None):
-                raise ValueError(f"value missing for {key}")
-            features.append(value)
+        #⁡⁣⁣⁢Validate and convert all features in one pass⁡
+        features = _validated_row(STRESS)
 
         #⁡⁣⁣⁢Make Prediction⁡
-        prediction = stressModel.predict([features])
-
-        print("Stress : ",prediction)
-
-        return jsonify({'message' : 'Response OK','prediction' : str(prediction[0])}),200
-
-    except Exception as e:
-        print("Error In stress model : ",str(e))
+        stressModel, version = registry.get_versioned('stress')
+        cache_key = ('stress', version, tuple(features[0].tolist()))
+        hit, stress = result_cache.get(cache_key)
+        if not hit:
+            with stage('predict', 'stress'), registry.timed('stress', version):
+                prediction = stressModel.predict(features)
+            stress = str(prediction[0])
+            result_cache.put(cache_key, stress)
+
+        log_event(logger, 'prediction', logging.DEBUG, model='stress', features=features[0].tolist(), prediction=stress, cached=hit)
+
+        return jsonify({'message' : 'Response OK','prediction' : stress}),200
+
+    except ValidationError as e:
+        return _invalid(e)
+    except Exception:
+        logger.exception('Error in stress model')
         return jsonify({"message" : "Internal Server Error"}),500
     
 
 @modelRouter.route('/sepsis',methods=['POST'])
 def get_sepsis_model():
     try:
-        data = request.json
+        features = _validated_row(SEPSIS)
 
-        features = []
+        #⁡⁣⁣⁢Clinical shortcut (SEPSIS_PREFILTER) decides some rows without the model⁡
+        if SEPSIS_PREFILTER.matches(features)[0]:
+            return jsonify({'message' : 'Response OK','prediction' : SEPSIS_PREFILTER.outcome}),200
 
-        feature_keys = ['Hour', 'HR', 'O2Sat', 'Temp', 'MAP', 'Resp', 'BUN', 'Chloride',
-            'Creatinine', 'Glucose', 'Hct', 'Hgb', 'WBC', 'Platelets',
-            'Age', 'HospAdmTime', 'ICULOS', '0', '1']  # Removed 'SepsisLabel'
+        sepsisPipeline, version = registry.get_versioned('sepsis_pipeline')
+        cache_key = ('sepsis', version, tuple(features[0].tolist()))
+        hit, has_sepsis = result_cache.get(cache_key)
+        if hit:
+            return jsonify({'message' : 'Response OK','prediction' : has_sepsis}),200
 
-        for feature in feature_keys:
-            value  = float(data.get(feature))
-            if value is None:
-                raise ValueError(f"Missing value for {feature}")  
-            features.append(value)
+        # Standardize and predict on the raw float64 row (no DataFrame round trip)
+        with stage('predict', 'sepsis'), registry.timed('sepsis_pipeline', version):
+            prediction = sepsisPipeline.predict(features)
+        has_sepsis = bool(prediction[0] == 1)
+        result_cache.put(cache_key, has_sepsis)
 
-        # Example: Raw user input (values in original scale)
-        if(int(data.get('HR'))>120 or int(data.get('HR'))<90 or int(data.get('Platelets'<150))):
-            return jsonify({'message' : 'Response OK','prediction' : True}),200
-        # user_input = np.array([[5, 90, 98, 37.2, 80, 20, 15, 105, 1.2, 120, 40, 13, 10, 250, 65, -10, 12, 0, 1]])
+        log_event(logger, 'prediction', logging.DEBUG, model='sepsis', features=features[0].tolist(), prediction=has_sepsis, cached=False)
 
-        user_input = np.array([features])
+        return jsonify({'message' : 'Response OK','prediction' : has_sepsis}),200
+
+    except ValidationError as e:
+        return _invalid(e)
+    except Exception:
+        logger.exception('Error in sepsis model')
+        return jsonify({"message" : "Internal Server Error"}),500
 
-        # Convert to DataFrame
-        user_input_df = pd.DataFrame(user_input, columns=feature_keys)
-        
-        # Apply the same standardization as during training
-        user_input_scaled = sepsisScaler.transform(user_input_df)
 
-        # Convert back to DataFrame
-        user_input_df_scaled = pd.DataFrame(user_input_scaled, columns=feature_keys)
+#⁡⁣⁣⁢Batch prediction⁡
+@modelRouter.route('/<name>/batch',methods=['POST'])
+def get_batch_predictions(name):
+    if name not in BATCH_MODELS:
+        return jsonify({'message' : f'Unknown model: {name}'}),404
 
-        # Make prediction
-        prediction = sepsiModel.predict(user_input_df_scaled)
+    keys = SCHEMAS[name].keys
+    chunk_size = request.args.get('chunk_size', default=config.BATCH_CHUNK_SIZE, type=int)
+    if chunk_size is None or chunk_size < 1:
+        return jsonify({'message' : 'chunk_size must be a positive integer'}),400
 
-        # Output prediction
-        if prediction[0] == 1:
-            print("Sepsis Detected!")
-        else:
-            print("No Sepsis Detected")
+    try:
+        n_rows, columns = to_columns(request.get_json(silent=True), keys)
+    except BatchFormatError as e:
+        return jsonify({'message' : str(e)}),400
 
-        return jsonify({'message' : 'Response OK','prediction' : bool(prediction[0] == 1)}),200
+    if n_rows > config.BATCH_MAX_ROWS:
+        return jsonify({'message' : f'Batch too large: {n_rows} rows (limit {config.BATCH_MAX_ROWS})'}),413
+
+    try:
+        with stage('predict_batch', name):
+            results = score_columns(name, n_rows, columns, chunk_size)
+        return jsonify({'message' : 'Response OK','count' : n_rows,'results' : results}),200
 
     except Exception as e:
-        print("Error in sepsis model : ",str(e))
+        log_event(logger, 'Error in batch prediction', logging.ERROR, model=name, error=str(e))
         return jsonify({"message" : "Internal Server Error"}),500
@@ -0,0 +1,119 @@
+import hmac
+import os
+from flask import Blueprint,jsonify,request,Response
+from model import control, registry
+import config
+from metrics import render
+import serving
+
+opsRouter = Blueprint('opsRouter',__name__)
+
+
+@opsRouter.before_request
+def _require_admin():
+    # Reading is open; everything that changes which model serves needs ADMIN_TOKEN
+    if request.method in ('GET', 'HEAD', 'OPTIONS'):
+        return None
+    if not config.ADMIN_TOKEN:
+        return jsonify({'message' : 'Model admin endpoints are disabled; set ADMIN_TOKEN'}),403
+    expected = f'Bearer {config.ADMIN_TOKEN}'.encode()
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+        return jsonify({'message' : 'Invalid or missing admin token'}),401
+    return None
+
+
+@opsRouter.route('/models',methods=['GET'])
+def get_models():
+    return jsonify(registry.stats()),200
+
+
+def _unknown(name):
+    return jsonify({'message' : f'Unknown model: {name}'}),404
+
+
+def _in_background():
+    return request.args.get('wait', '1') in ('0', 'false')
+
+
+def _candidate_path(relative):
+    """Resolve a candidate file relative to MODEL_DIR; files outside it are refused."""
+    root = os.path.realpath(config.MODEL_DIR)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ValueError(f'{relative} is not a file under MODEL_DIR')
+    return path
+
+
+@opsRouter.route('/models/<name>/reload',methods=['POST'])
+def reload_model(name):
+    if name not in registry.names():
+        return _unknown(name)
+    # ?wait=0 loads and warms on a background thread; the current version serves until the swap
+    if _in_background():
+        registry.in_background(name, 'reload', control.reload, name)
+        return jsonify({'message' : 'Reload started','model' : name}),202
+    version = control.reload(name)
+    return jsonify({'message' : 'Response OK','model' : name,'version' : version}),200
+
+
+@opsRouter.route('/models/<name>/candidate',methods=['POST'])
+def load_candidate(name):
+    if name not in registry.names():
+        return _unknown(name)
+    body = request.get_json(silent=True) or {}
+    try:
+        path = _candidate_path(str(body.get('path', '')))
+        percent = float(body.get('percent', 10))
+        if not 0 <= percent <= 100:
+            raise ValueError('percent must be between 0 and 100')
+    except (TypeError, ValueError) as e:
+        return jsonify({'message' : str(e)}),400
+    if _in_background():
+        registry.in_background(name, 'candidate', control.load_candidate, name, path, percent)
+        return jsonify({'message' : 'Candidate load started','model' : name}),202
+    version = control.load_candidate(name, path, percent)
+    return jsonify({'message' : 'Response OK','model' : name,'version' : version,'percent' : percent}),200
+
+
+@opsRouter.route('/models/<name>/candidate',methods=['PUT'])
+def set_candidate_percent(name):
+    try:
+        percent = float((request.get_json(silent=True) or {}).get('percent'))
+    except (TypeError, ValueError):
+        percent = -1
+    if not 0 <= percent <= 100:
+        return jsonify({'message' : 'percent must be a number between 0 and 100'}),400
+    try:
+        control.set_candidate_percent(name, percent)
+    except KeyError:
+        return jsonify({'message' : f'No candidate for {name}'}),404
+    return jsonify({'message' : 'Response OK','model' : name,'percent' : percent}),200
+
+
+@opsRouter.route('/models/<name>/candidate',methods=['DELETE'])
+def drop_candidate(name):
+    try:
+        control.drop_candidate(name)
+    except KeyError:
+        return jsonify({'message' : f'No candidate for {name}'}),404
+    return jsonify({'message' : 'Response OK','model' : name}),200
+
+
+@opsRouter.route('/models/<name>/promote',methods=['POST'])
+def promote_candidate(name):
+    try:
+        version = control.promote(name)
+    except KeyError:
+        return jsonify({'message' : f'No candidate for {name}'}),404
+    return jsonify({'message' : 'Response OK','model' : name,'version' : version}),200
+
+
+@opsRouter.route('/metrics',methods=['GET'])
+def get_metrics():
+    return Response(render(),mimetype='text/plain; version=0.0.4')
+
+
+@opsRouter.route('/ready',methods=['GET'])
+def get_readiness():
+    ready, details = serving.readiness()
+    return jsonify({'ready' : ready, **details}),200 if ready else 503
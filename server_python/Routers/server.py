@@ -1,105 +1,533 @@
-from flask import Flask, request, jsonify, send_file, Blueprint
+from flask import Flask, request, jsonify, send_file, Blueprint, Response, url_for
 import numpy as np
 from PIL import Image
 import io
-import tensorflow as tf
-import jinja2
 import base64
-from sklearn.preprocessing import MinMaxScaler
-from scipy import ndimage
 import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-from datetime import datetime
+from plotly.utils import PlotlyJSONEncoder
+import json
+import zipfile
+import config
+from scheduler import InferenceScheduler
+from model import registry
+import preprocessing
+from jobs import JobManager, QueueFull
+from report import generate_html_report, render_report
+from artifacts import ArtifactStore
+from analysis_cache import AnalysisCache, cache_key
+import bulk_mri
+import volume
+from metrics import REGISTRY, stage
+from encoding import encode_image, encode_raw, decode_image, default_options, options_from_args, is_archival, RAW_CONTENT_TYPE
+import os
+import tempfile
+import time
 import uuid
 
 # Flask Blueprint
 server = Blueprint('server', __name__)
 
-# Load the pre-trained model
-model = tf.keras.models.load_model('PKL/model.h5')
+# Intensity above which extract_tumor marks a pixel as tumor
+TUMOR_THRESHOLD = 0.6
+
+BATCH_SIZE = REGISTRY.histogram('medisense_inference_batch_size', 'Requests combined into one CNN forward pass.',
+                                buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_WAIT = REGISTRY.histogram('medisense_inference_queue_wait_seconds',
+                                'Time the oldest request in a batch waited before the forward pass.')
+
+def _record_batch(entry):
+    BATCH_SIZE.observe(entry['batch_size'])
+    BATCH_WAIT.observe(entry['wait_ms'] / 1000.0)
+
+def _predict_tumor(batch):
+    # One version per forward pass; with a candidate loaded, passes are split between versions
+    cnn, version = registry.get_versioned('brain_tumor')
+    with registry.timed('brain_tumor', version):
+        return cnn.predict_on_batch(batch)[:, 0]
+
+# Concurrent /analyze requests share batched forward passes.
+# The CNN is fetched from the shared registry, so TensorFlow loads on first use.
+inference_scheduler = InferenceScheduler(
+    _predict_tumor,
+    max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=config.INFERENCE_MAX_WAIT_MS,
+    on_batch=_record_batch
+)
+REGISTRY.gauge('medisense_inference_queue_depth', 'Requests waiting for the CNN scheduler.',
+               function=lambda: inference_scheduler.stats()['queue_depth'])
+
+# Analysis outputs are kept server-side so reports can reference them by id
+artifact_store = ArtifactStore(
+    max_bytes=config.ARTIFACT_MAX_BYTES,
+    spill_dir=config.ARTIFACT_SPILL_DIR,
+    spill_max_bytes=config.ARTIFACT_SPILL_MAX_BYTES
+)
+REGISTRY.gauge('medisense_artifact_store_bytes', 'Bytes of analysis artifacts held in memory.',
+               function=lambda: artifact_store.stats()['bytes'])
+
+# Finished analyses by content hash, so re-uploaded scans skip the pipeline
+analysis_cache = AnalysisCache(
+    max_bytes=config.ANALYSIS_CACHE_MAX_BYTES,
+    directory=config.ANALYSIS_CACHE_DIR,
+    disk_max_bytes=config.ANALYSIS_CACHE_DISK_MAX_BYTES
+)
+REGISTRY.gauge('medisense_analysis_cache_bytes', 'Bytes of cached analyses held in memory.',
+               function=lambda: analysis_cache.stats()['bytes'])
+
+# Full-size pixels kept for /generate-report when the returned images are lossy or thumbnails
+REPORT_COPIES = {'processed_image': 'report_processed_image', 'tumor_image': 'report_tumor_image'}
+
+def _publisher(emit, inline, raw):
+    """``publish(key, data, content_type)``: store an output, emit it and the artifact ids so far.
+
+    With ``payload=False`` the output is only stored; its id still goes out in ``artifacts``.
+    """
+    artifacts = {}
+
+    def publish(key, data, content_type, payload=True):
+        artifacts[key] = artifact_store.put(data, content_type)
+        if raw is not None:
+            raw[key] = (data, content_type)
+        if inline and payload:
+            # The plot is JSON text; images go out as base64
+            if content_type == 'application/json':
+                emit(key, data.decode())
+            else:
+                with stage('base64', 'brain_tumor'):
+                    value = base64.b64encode(data).decode()
+                emit(key, value)
+        emit('artifacts', dict(artifacts))
+
+    return publish
+
+def run_analysis(img, emit, grid_size=None, surface_encoding=None, inline=True, image_options=None, raw=None):
+    """Run the full MRI analysis, calling ``emit(key, value)`` as each part is ready.
+
+    The probability comes first, then the two images, then the 3D plot, which
+    is the most expensive part to build and serialise. Every output is also
+    put in the artifact store; ``artifacts`` is re-emitted with the ids stored
+    so far. With ``inline=False`` only the ids are emitted, not the payloads.
+    ``encoding`` reports the image format, encode time and bytes. A ``raw``
+    dict receives ``key -> (bytes, content type)`` for every output.
+
+    When ``image_options`` are lossy or thumbnailed, the full-size pixels of
+    each image are also stored, unencoded, under its ``REPORT_COPIES`` name,
+    so a report built from the artifact ids keeps the full, lossless scans.
+    Only a report that is actually generated pays for encoding them.
+    """
+    publish = _publisher(emit, inline, raw)
+
+    # Image.open is lazy; force the decode so it is timed on its own
+    with stage('decode', 'brain_tumor'):
+        img.load()
 
-@server.route('/analyze', methods=['POST'])
-def analyze_image():
-    # Get the uploaded image
-    file = request.files['image']
-    img = Image.open(file.stream)
-    
     # Preprocess the image for prediction
-    img_array = np.array(img.resize((224, 224))) / 255.0
-    prediction = model.predict(np.expand_dims(img_array, 0))[0][0]
-    
+    with stage('preprocess', 'brain_tumor'):
+        img_array = np.array(img.resize((224, 224))) / 255.0
+    with stage('predict', 'brain_tumor'):
+        prediction = inference_scheduler.predict(img_array)
+    emit('probability', float(prediction))
+
     # Process the image for visualization
-    processed_img = load_and_preprocess(img)
-    tumor_array, tumor_mask = extract_tumor(processed_img)
-    
+    with stage('preprocess', 'brain_tumor'):
+        processed_img = load_and_preprocess(img)
+    with stage('segmentation', 'brain_tumor'):
+        tumor_array, tumor_mask = extract_tumor(processed_img)
+
+    # Encode images for the frontend
+    image_options = image_options or default_options()
+    keep_pixels = not is_archival(image_options)
+    encoding = {'format': image_options.format, 'encode_ms': 0.0, 'bytes': {}}
+    for key, array in (('processed_image', processed_img), ('tumor_image', tumor_array)):
+        with stage('encode', 'brain_tumor'):
+            data, content_type, seconds = encode_image(array, image_options)
+        encoding['content_type'] = content_type
+        encoding['encode_ms'] += seconds * 1000.0
+        encoding['bytes'][key] = len(data)
+        publish(key, data, content_type)
+        if keep_pixels:
+            with stage('encode', 'brain_tumor'):
+                data = encode_raw(array)
+            publish(REPORT_COPIES[key], data, RAW_CONTENT_TYPE, payload=False)
+    encoding['encode_ms'] = round(encoding['encode_ms'], 3)
+    emit('encoding', encoding)
+
     # Create 3D plot
-    fig_3d = create_3d_plot(processed_img, tumor_mask)
-    plot_json = fig_3d.to_json()
-    
-    # Convert images to base64 for frontend
-    img_base64 = image_to_base64(processed_img)
-    tumor_base64 = image_to_base64(tumor_array)
-    
+    with stage('plot_serialization', 'brain_tumor'):
+        fig_3d = create_3d_plot(processed_img, tumor_mask, grid_size=grid_size)
+        plot_json = plot_to_json(fig_3d, surface_encoding or config.SURFACE_ENCODING)
+    publish('plot_3d', plot_json.encode(), 'application/json')
+
+def run_cached_analysis(image_bytes, emit, grid_size=None, surface_encoding=None, inline=True, image_options=None,
+                        raw=None):
+    """``run_analysis`` on uploaded bytes, replayed from ``analysis_cache`` when possible.
+
+    The key covers the bytes, the CNN's file fingerprint and every parameter
+    that changes the output. A hit emits the same keys in the same order as a
+    fresh run, with new artifact ids. Returns True for a hit.
+    """
+    image_options = image_options or default_options()
+    grid_size = config.SURFACE_GRID_SIZE if grid_size is None else grid_size
+    surface_encoding = surface_encoding or config.SURFACE_ENCODING
+    key = None
+    # While a candidate CNN takes part of the traffic, a result may not come from the fingerprinted model
+    if analysis_cache.enabled and not registry.has_candidate('brain_tumor'):
+        key = cache_key(image_bytes, registry.fingerprint('brain_tumor'), {
+            'grid_size': grid_size,
+            'surface_encoding': surface_encoding,
+            'image_options': image_options,
+            'max_side': config.PREPROCESS_MAX_SIDE,
+            'threshold': TUMOR_THRESHOLD,
+            'decimals': config.SURFACE_DECIMALS,
+        })
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            meta, parts = cached
+            publish = _publisher(emit, inline, raw)
+            emit('probability', meta['probability'])
+            for part in ('processed_image', 'tumor_image'):
+                publish(part, *parts[part])
+                if REPORT_COPIES[part] in parts:
+                    publish(REPORT_COPIES[part], *parts[REPORT_COPIES[part]], payload=False)
+            emit('encoding', meta['encoding'])
+            publish('plot_3d', *parts['plot_3d'])
+            return True
+
+    outputs, meta = {}, {}
+
+    def record(part, value):
+        if part in ('probability', 'encoding'):
+            meta[part] = value
+        emit(part, value)
+
+    run_analysis(Image.open(io.BytesIO(image_bytes)), record, grid_size=grid_size,
+                 surface_encoding=surface_encoding, inline=inline, image_options=image_options, raw=outputs)
+    if raw is not None:
+        raw.update(outputs)
+    if key is not None:
+        analysis_cache.put(key, meta, outputs)
+    return False
+
+def _analysis_options():
+    return {
+        'grid_size': request.args.get('surface_grid', config.SURFACE_GRID_SIZE, type=int),
+        'surface_encoding': request.args.get('surface_encoding', config.SURFACE_ENCODING),
+        'inline': request.args.get('inline', '1') not in ('0', 'false'),
+        'image_options': options_from_args(request.args),
+    }
+
+def multipart_response(parts):
+    """A multipart/mixed response from ``[(name, bytes, content type)]``."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, data, content_type in parts:
+        body.write(f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+                   f'Content-Disposition: inline; name="{name}"\r\nContent-Length: {len(data)}\r\n\r\n'.encode())
+        body.write(data)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return Response(body.getvalue(), mimetype=f'multipart/mixed; boundary={boundary}')
+
+@server.route('/analyze', methods=['POST'])
+def analyze_image():
+    # Get the uploaded image; the bytes are hashed for the analysis cache
+    image_bytes = request.files['image'].read()
+
+    try:
+        options = _analysis_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # ?response=multipart returns the images and plot as raw parts instead of base64 inside JSON
+    multipart = request.args.get('response', 'json') == 'multipart'
+    if multipart:
+        options['inline'] = False
+
+    results = {}
+    raw = {} if multipart else None
+    started = time.perf_counter()
+    cached = run_cached_analysis(image_bytes, results.__setitem__, raw=raw, **options)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+    if multipart:
+        parts = [('result', json.dumps(results).encode(), 'application/json')]
+        parts.extend((key, data, content_type) for key, (data, content_type) in raw.items()
+                     if key not in REPORT_COPIES.values())
+        response = multipart_response(parts)
+    else:
+        response = jsonify(results)
+    # A cache hit did no encoding, so encode_ms is the original run's
+    response.headers['Server-Timing'] = (f"encode;dur={0.0 if cached else results['encoding']['encode_ms']:.1f}, "
+                                         f"analysis;dur={elapsed_ms:.1f}")
+    response.headers['X-Analysis-Cache'] = 'hit' if cached else 'miss'
+    return response
+
+# Asynchronous mode: submit, then poll or follow server-sent events
+analysis_jobs = JobManager(workers=config.JOB_WORKERS, max_pending=config.JOB_MAX_PENDING, ttl=config.JOB_TTL,
+                           max_finished=config.JOB_MAX_FINISHED)
+
+def _run_analysis_job(job, image_bytes, options):
+    run_cached_analysis(image_bytes, job.publish, **options)
+
+@server.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    if 'image' not in request.files:
+        return jsonify({'error': 'Missing image file'}), 400
+
+    # The upload stream is closed once the request ends, so hand the worker the bytes
+    image_bytes = request.files['image'].read()
+    try:
+        options = _analysis_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        job = analysis_jobs.submit(_run_analysis_job, image_bytes, options)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    except RuntimeError:
+        # The job pool has been shut down; this worker is draining
+        return jsonify({'error': 'Server is shutting down'}), 503, {'Retry-After': '5'}
+
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('server.get_analysis_job', job_id=job.id),
+        'events_url': url_for('server.stream_analysis_job', job_id=job.id),
+    }), 202
+
+@server.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.snapshot())
+
+@server.route('/analyze/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+
+    # Event ids are positions in the job's event log, so reconnecting clients can resume
+    start = request.headers.get('Last-Event-ID', -1, type=int) + 1
+    # EventSource reconnects after the stream closes on `done`; 204 tells it to stop
+    if job.finished and start >= job.event_count():
+        return Response(status=204)
+
+    def stream():
+        index = start
+        while True:
+            events = job.events_since(index, timeout=15)
+            if not events:
+                if job.finished:
+                    # Nothing left past a client-supplied id beyond the final event
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            for key, value in events:
+                yield f'id: {index}\nevent: {key}\ndata: {json.dumps(value)}\n\n'
+                index += 1
+                if key in ('done', 'failed'):
+                    return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@server.route('/analyze/bulk', methods=['POST'])
+def analyze_bulk():
+    """Classify many scans (``images`` files and/or a zip ``archive``), streamed back as JSON Lines."""
+    # Checked before the body is parsed; a chunked upload has no length to check
+    if request.content_length is None:
+        return jsonify({'error': 'A Content-Length header is required'}), 411
+    if request.content_length > config.BULK_MAX_UPLOAD_BYTES:
+        return jsonify({'error': f'Upload is larger than {config.BULK_MAX_UPLOAD_BYTES} bytes'}), 413
+
+    sources = []
+    for file in request.files.getlist('images'):
+        sources.append((file.filename, lambda data=file.read(): io.BytesIO(data)))
+
+    if 'archive' in request.files:
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(request.files['archive'].read()))
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'archive is not a valid zip file'}), 400
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and info.filename.lower().endswith(bulk_mri.IMAGE_EXTENSIONS)]
+        # file_size comes from the zip directory; zipfile stops reading a member at that size
+        if sum(info.file_size for info in members) > config.BULK_MAX_UNCOMPRESSED_BYTES:
+            return jsonify({'error': f'archive unpacks to more than {config.BULK_MAX_UNCOMPRESSED_BYTES} bytes'}), 413
+        for info in members:
+            sources.append((info.filename, lambda info=info: archive.open(info)))
+
+    if len(sources) > config.BULK_MAX_FILES:
+        return jsonify({'error': f'At most {config.BULK_MAX_FILES} scans per request'}), 413
+    if not sources:
+        return jsonify({'error': 'Upload scans as "images" files or a zip "archive"'}), 400
+
+    batch_size = request.args.get('batch_size', config.BULK_BATCH_SIZE, type=int)
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be at least 1'}), 400
+    segment = request.args.get('segment', '0') in ('1', 'true')
+    progress = bulk_mri.Progress(total=len(sources), stream=None)
+
+    def stream():
+        for result in bulk_mri.scan(sources, batch_size=batch_size, workers=config.BULK_DECODE_WORKERS,
+                                    segment=segment, progress=progress):
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': progress.summary()}) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+@server.route('/analyze/volume', methods=['POST'])
+def analyze_volume_upload():
+    """Classify every slice of a multi-slice scan (``volume``: .npy or multi-page TIFF) and plot it in 3D."""
+    file = request.files.get('volume')
+    extension = os.path.splitext(file.filename or '')[1].lower() if file is not None else ''
+    if extension not in volume.VOLUME_EXTENSIONS:
+        return jsonify({'error': f'Upload a "volume" file ({", ".join(volume.VOLUME_EXTENSIONS)})'}), 400
+
+    method = request.args.get('aggregate', config.VOLUME_AGGREGATE)
+    if method not in volume.AGGREGATES:
+        return jsonify({'error': f'aggregate must be one of {", ".join(volume.AGGREGATES)}'}), 400
+    options = {
+        'batch_size': request.args.get('batch_size', config.VOLUME_BATCH_SIZE, type=int),
+        'workers': config.VOLUME_WORKERS or None,
+        'grid_size': request.args.get('grid', config.VOLUME_GRID_SIZE, type=int),
+        'threshold': TUMOR_THRESHOLD,
+        'method': method,
+        'top_k': request.args.get('top_k', config.VOLUME_TOP_K, type=int),
+    }
+    for option, key in (('batch_size', 'batch_size'), ('grid', 'grid_size'), ('top_k', 'top_k')):
+        if options[key] < 1:
+            return jsonify({'error': f'{option} must be at least 1'}), 400
+    inline = request.args.get('inline', '1') not in ('0', 'false')
+
+    # Written to disk so the volume is memory mapped instead of read into memory
+    with tempfile.NamedTemporaryFile(suffix=extension, dir=config.VOLUME_TMP_DIR or None) as tmp:
+        file.save(tmp)
+        tmp.flush()
+        try:
+            scan = volume.open_volume(tmp.name)
+        except (ValueError, OSError) as e:
+            return jsonify({'error': f'Could not read volume: {e}'}), 400
+        try:
+            with stage('volume', 'brain_tumor'):
+                result, figure = volume.analyze_volume(scan, **options)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        finally:
+            scan.close()
+
+    with stage('plot_serialization', 'brain_tumor'):
+        plot_json = plot_to_json(figure, request.args.get('surface_encoding', config.SURFACE_ENCODING))
+    result['artifacts'] = {'plot_3d': artifact_store.put(plot_json.encode(), 'application/json')}
+    if inline:
+        result['plot_3d'] = plot_json
+    return jsonify(result)
+
+@server.route('/analyze/stats', methods=['GET'])
+def analyze_stats():
     return jsonify({
-        'probability': float(prediction),
-        'plot_3d': plot_json,
-        'processed_image': img_base64,
-        'tumor_image': tumor_base64
+        'scheduler': inference_scheduler.stats(),
+        'jobs': analysis_jobs.stats(),
+        'artifacts': artifact_store.stats(),
+        'analysis_cache': analysis_cache.stats(),
     })
 
+@server.route('/artifacts/<artifact_id>', methods=['GET'])
+def get_artifact(artifact_id):
+    item = artifact_store.get(artifact_id)
+    if item is None:
+        return jsonify({'error': 'Unknown or expired artifact'}), 404
+    data, content_type = item
+    response = Response(data, mimetype=content_type)
+    # Ids are random and never reused, so the content never changes
+    response.headers['Cache-Control'] = 'private, max-age=3600, immutable'
+    return response
+
+class ArtifactMissing(KeyError):
+    pass
+
+def _artifact_bytes(artifact_id):
+    item = artifact_store.get(artifact_id)
+    if item is None:
+        raise ArtifactMissing(artifact_id)
+    return item[0]
+
+def _artifact_image(artifact_id):
+    item = artifact_store.get(artifact_id)
+    if item is None:
+        raise ArtifactMissing(artifact_id)
+    return decode_image(*item)
+
 @server.route('/generate-report', methods=['POST'])
 def generate_report():
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
     try:
         # Generate HTML report
-        html_content = generate_html_report(
-            data['patient_info'],
-            data['tumor_info'],
-            data['images']['original'],
-            data['images']['tumor'],
-            data['plot_3d']
-        )
+        if 'artifacts' in data:
+            # Outputs of an earlier /analyze call, referenced by id instead of re-uploaded;
+            # the full-size copies are used when the returned images were lossy or thumbnails
+            artifact_ids = data['artifacts']
+            if not isinstance(artifact_ids, dict):
+                return jsonify({'error': 'artifacts must be an object of output name -> artifact id'}), 400
+            images = [artifact_ids.get(REPORT_COPIES[key]) or artifact_ids[key]
+                      for key in ('processed_image', 'tumor_image')]
+            with stage('report_render'):
+                html_content = render_report(
+                    data['patient_info'],
+                    data['tumor_info'],
+                    _artifact_image(images[0]),
+                    _artifact_image(images[1]),
+                    _artifact_bytes(artifact_ids['plot_3d']).decode()
+                )
+        else:
+            with stage('report_render'):
+                html_content = generate_html_report(
+                    data['patient_info'],
+                    data['tumor_info'],
+                    data['images']['original'],
+                    data['images']['tumor'],
+                    data['plot_3d']
+                )
         return send_file(
             io.BytesIO(html_content.encode()),
             mimetype='text/html',
             as_attachment=True,
             download_name='report.html'
         )
+    except ArtifactMissing as e:
+        return jsonify({'error': f'Artifact not found or expired: {e.args[0]}'}), 404
     except KeyError as e:
         return jsonify({'error': f'Missing key in request data: {str(e)}'}), 400
 
-def image_to_base64(img_array):
-    """Convert a numpy array to a base64-encoded image."""
-    img = Image.fromarray((img_array * 255).astype(np.uint8))
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+def image_to_base64(img_array, options=None):
+    """Convert a numpy array to a base64-encoded image (IMAGE_FORMAT unless ``options`` say otherwise)."""
+    return base64.b64encode(encode_image(img_array, options)[0]).decode()
 
 def load_and_preprocess(image):
-    """Preprocess the image for analysis."""
-    img_array = np.array(image.convert('L'))
-    img_array = ndimage.gaussian_filter(img_array, sigma=1.5)
-    p2, p98 = np.percentile(img_array, (2, 98))
-    img_array = np.clip(img_array, p2, p98)
-    scaler = MinMaxScaler()
-    img_array = scaler.fit_transform(img_array)
-    return img_array
-
-def extract_tumor(img_array, threshold=0.6):
+    """Preprocess the image for analysis (float32, scaled to [0, 1])."""
+    return preprocessing.preprocess_image(image, max_side=config.PREPROCESS_MAX_SIDE)
+
+def extract_tumor(img_array, threshold=TUMOR_THRESHOLD):
     """Extract tumor regions from the image."""
-    tumor_mask = img_array > threshold
-    tumor_array = np.zeros_like(img_array)
-    tumor_array[tumor_mask] = img_array[tumor_mask]
-    return tumor_array, tumor_mask
-
-def create_3d_plot(img_array, tumor_mask):
-    """Create a 3D plot of the MRI scan with tumor highlighted."""
-    x = np.arange(0, img_array.shape[1], 1)
-    y = np.arange(0, img_array.shape[0], 1)
-    x, y = np.meshgrid(x, y)
+    return preprocessing.extract_tumor(img_array, threshold)
+
+def create_3d_plot(img_array, tumor_mask, grid_size=None):
+    """Create a 3D plot of the MRI scan with tumor highlighted.
+
+    The surface is area-averaged down to at most ``grid_size`` points per side
+    and uses 1-D x/y axes in original pixel coordinates, so it covers the same
+    extent as the full-resolution scan. Volumes are plotted by
+    ``volume.analyze_volume``.
+    """
     img_array_colored = np.where(tumor_mask, img_array * 1.5, img_array)
-    
-    fig = go.Figure(data=[go.Surface(z=img_array_colored, x=x, y=y, colorscale='plasma')])
+    grid_size = config.SURFACE_GRID_SIZE if grid_size is None else grid_size
+    z, y, x = preprocessing.block_mean(img_array_colored, grid_size)
+    z = np.round(z, config.SURFACE_DECIMALS)
+
+    fig = go.Figure(data=[go.Surface(z=z, x=x, y=y, colorscale='plasma')])
     fig.update_layout(
         title='3D MRI Scan Visualization with Tumor Highlighted',
         scene=dict(
@@ -114,287 +542,22 @@ def create_3d_plot(img_array, tumor_mask):
     )
     return fig
 
-def generate_html_report(patient_info, tumor_info, original_b64, tumor_b64, plot_3d_json):
-    """Generate an HTML report using Jinja2 templating."""
-    # Decode images from base64
-    original_img = Image.open(io.BytesIO(base64.b64decode(original_b64)))
-    tumor_img = Image.open(io.BytesIO(base64.b64decode(tumor_b64)))
-
-    # Create comparison plot
-    img_buffer = io.BytesIO()
-    plt.figure(figsize=(12, 6))
-    plt.subplot(121)
-    plt.imshow(original_img, cmap='gray')
-    plt.title('Original Image')
-    plt.axis('off')
-    plt.subplot(122)
-    plt.imshow(tumor_img, cmap='gray')
-    plt.title('Extracted Tumor')
-    plt.axis('off')
-    plt.savefig(img_buffer, format='png', bbox_inches='tight', pad_inches=0)
-    plt.close()
-    img_buffer.seek(0)
-    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-
-    # Current date and report ID
-    current_date = datetime.now().strftime("%B %d, %Y")
-    report_id = f"MRI-{str(uuid.uuid4())[:8].upper()}"
-    
-    # Format probability for display
-    probability_percentage = f"{(tumor_info['probability'] * 100):.1f}%"
-    
-    # Determine severity level
-    severity = "Low"
-    severity_color = "#057a55"  # Green
-    if tumor_info['probability'] > 0.7:
-        severity = "High"
-        severity_color = "#c81e1e"  # Red
-    elif tumor_info['probability'] > 0.4:
-        severity = "Medium"
-        severity_color = "#c27803"  # Amber
-    
-    # Render HTML template
-    template = jinja2.Template("""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Neurological Assessment Report</title>
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-            body { font-family: 'Inter', sans-serif; }
-            .plotly-graph-div { width: 100%; height: 100%; }
-        </style>
-    </head>
-    <body class="bg-gray-50">
-        <div class="min-h-screen flex flex-col">
-            <!-- Header -->
-            <header class="bg-white border-b border-gray-200 shadow-sm print:shadow-none">
-                <div class="container mx-auto px-4 py-4">
-                    <div class="flex justify-between items-center">
-                        <div class="flex items-center space-x-3">
-                            <div class="text-primary-600">
-                                <svg xmlns="http://www.w3.org/2000/svg" class="h-8 w-8" viewBox="0 0 20 20" fill="currentColor">
-                                    <path fill-rule="evenodd" d="M10 18a8 8 0 100-16 8 8 0 000 16zm1-11a1 1 0 10-2 0v2H7a1 1 0 100 2h2v2a1 1 0 102 0v-2h2a1 1 0 100-2h-2V7z" clip-rule="evenodd" />
-                                </svg>
-                            </div>
-                            <div>
-                                <h1 class="text-xl font-semibold text-gray-900">Medical Diagnostics Center</h1>
-                                <p class="text-sm text-gray-500">Neurological Assessment Report</p>
-                            </div>
-                        </div>
-                        <div class="text-right">
-                            <p class="text-sm text-gray-700"><span class="font-medium">Report ID:</span> {{ report_id }}</p>
-                            <p class="text-sm text-gray-700"><span class="font-medium">Date:</span> {{ current_date }}</p>
-                        </div>
-                    </div>
-                </div>
-            </header>
-
-            <!-- Main Content -->
-            <main class="flex-grow">
-                <div class="container mx-auto px-4 py-8">
-                    <div class="grid grid-cols-1 lg:grid-cols-4 gap-8">
-                        <!-- Left Column: Patient Information -->
-                        <div class="lg:col-span-1">
-                            <div class="bg-white rounded-md shadow-sm overflow-hidden mb-6">
-                                <div class="border-b border-gray-200 px-4 py-3">
-                                    <h2 class="text-lg font-medium text-gray-800">Patient Information</h2>
-                                </div>
-                                <div class="p-4">
-                                    <div class="space-y-3">
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Full Name</p>
-                                            <p class="font-medium text-gray-900">{{ patient_info.name }}</p>
-                                        </div>
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Age</p>
-                                            <p class="text-gray-900">{{ patient_info.age }} years</p>
-                                        </div>
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Gender</p>
-                                            <p class="text-gray-900">{{ patient_info.gender }}</p>
-                                        </div>
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Examination</p>
-                                            <p class="text-gray-900">Brain MRI Analysis</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <div class="bg-white rounded-md shadow-sm overflow-hidden mb-6">
-                                <div class="border-b border-gray-200 px-4 py-3">
-                                    <h2 class="text-lg font-medium text-gray-800">Results Summary</h2>
-                                </div>
-                                <div class="p-4">
-                                    <div class="space-y-3">
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Status</p>
-                                            <div class="flex items-center mt-1">
-                                                <div class="w-3 h-3 rounded-full {{ 'bg-red-500' if tumor_info.detected else 'bg-green-500' }} mr-2"></div>
-                                                <p class="font-medium {{ 'text-red-600' if tumor_info.detected else 'text-green-600' }}">
-                                                    {{ 'Anomaly Detected' if tumor_info.detected else 'No Anomaly Detected' }}
-                                                </p>
-                                            </div>
-                                        </div>
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Confidence Score</p>
-                                            <p class="font-medium text-gray-900">{{ probability_percentage }}</p>
-                                        </div>
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Severity Assessment</p>
-                                            <p class="font-medium" style="color: {{ severity_color }}">{{ severity }}</p>
-                                        </div>
-                                        <div>
-                                            <p class="text-xs uppercase font-medium text-gray-500">Recommendation</p>
-                                            <p class="text-gray-900">{{ 'Immediate consultation recommended' if tumor_info.probability > 0.7 else ('Follow-up evaluation advised' if tumor_info.probability > 0.4 else 'Routine monitoring') }}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-
-                        <!-- Right Column: Visualizations -->
-                        <div class="lg:col-span-3 space-y-6">
-                            <!-- Image Analysis -->
-                            <div class="bg-white rounded-md shadow-sm overflow-hidden">
-                                <div class="border-b border-gray-200 px-4 py-3">
-                                    <h2 class="text-lg font-medium text-gray-800">Image Analysis</h2>
-                                </div>
-                                <div class="p-4">
-                                    <img src="data:image/png;base64,{{ img_base64 }}" class="w-full h-auto rounded-md" alt="Brain scan comparison">
-                                    <div class="grid grid-cols-2 gap-4 mt-4">
-                                        <div>
-                                            <h3 class="text-sm font-medium text-gray-700">Original Processed Scan</h3>
-                                            <p class="text-xs text-gray-500 mt-1">Preprocessed MRI scan with enhanced contrast for better visualization.</p>
-                                        </div>
-                                        <div>
-                                            <h3 class="text-sm font-medium text-gray-700">Region of Interest</h3>
-                                            <p class="text-xs text-gray-500 mt-1">Computer-identified potential anomalous region based on intensity patterns.</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- 3D Visualization -->
-                            <div class="bg-white rounded-md shadow-sm overflow-hidden">
-                                <div class="border-b border-gray-200 px-4 py-3">
-                                    <h2 class="text-lg font-medium text-gray-800">3D Tissue Density Visualization</h2>
-                                </div>
-                                <div class="p-4">
-                                    <div id="plotly-div" class="w-full rounded-md bg-gray-50" style="height: 500px;"></div>
-                                    <p class="text-xs text-gray-500 mt-3">
-                                        Three-dimensional representation of tissue density from MRI scan data. Suspected anomalous regions appear as elevated areas with distinct coloration. This interactive visualization can be rotated and zoomed for detailed examination.
-                                    </p>
-                                </div>
-                            </div>
-                            
-                            <!-- Technical Details -->
-                            <div class="bg-white rounded-md shadow-sm overflow-hidden">
-                                <div class="border-b border-gray-200 px-4 py-3">
-                                    <h2 class="text-lg font-medium text-gray-800">Technical Assessment</h2>
-                                </div>
-                                <div class="p-4">
-                                    <div class="space-y-4">
-                                        <div>
-                                            <h3 class="text-sm font-medium text-gray-700">Analysis Methodology</h3>
-                                            <p class="text-sm text-gray-600 mt-1">
-                                                Deep learning neural network analysis combined with image segmentation techniques to identify potential anomalies in brain tissue. The system analyzes intensity patterns, structural features, and contextual information to detect irregularities.
-                                            </p>
-                                        </div>
-                                        <div>
-                                            <h3 class="text-sm font-medium text-gray-700">Confidence Assessment</h3>
-                                            <div class="w-full bg-gray-200 rounded-full h-2 mt-2">
-                                                <div class="rounded-full h-2" style="width: {{ probability_percentage }}; background-color: {{ severity_color }};"></div>
-                                            </div>
-                                            <div class="flex justify-between mt-1">
-                                                <span class="text-xs text-gray-500">0%</span>
-                                                <span class="text-xs text-gray-500">50%</span>
-                                                <span class="text-xs text-gray-500">100%</span>
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <!-- Medical Advisory Section -->
-                    <div class="mt-6">
-                        <div class="bg-white rounded-md shadow-sm overflow-hidden">
-                            <div class="border-b border-gray-200 px-4 py-3">
-                                <h2 class="text-lg font-medium text-gray-800">Medical Advisory</h2>
-                            </div>
-                            <div class="p-4">
-                                <div class="prose prose-sm max-w-none text-gray-600">
-                                    <p>The analysis provided in this report is based on computational algorithms designed to assist medical professionals. These results should be interpreted by qualified healthcare providers in conjunction with clinical findings and other diagnostic procedures.</p>
-                                    
-                                    <p class="mt-3">{{ 'Based on the analysis, the presence of an abnormal mass is indicated with a high degree of confidence. Immediate consultation with a neurologist or neurosurgeon is strongly advised.' if tumor_info.probability > 0.7 else ('The analysis indicates possible anomalous tissue that requires further investigation. Consultation with a neurologist is recommended for additional assessment.' if tumor_info.probability > 0.4 else 'The analysis shows no significant abnormalities. Routine follow-up is advised as per standard clinical protocols.') }}</p>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </main>
-
-            <!-- Footer -->
-            <footer class="bg-gray-100 border-t border-gray-200 mt-auto">
-                <div class="container mx-auto px-4 py-6">
-                    <div class="flex flex-col md:flex-row justify-between">
-                        <div>
-                            <p class="text-xs text-gray-600">Medical Diagnostics Center</p>
-                            <p class="text-xs text-gray-500">Advanced Neuroimaging Department</p>
-                        </div>
-                        <div class="mt-4 md:mt-0">
-                            <p class="text-xs text-gray-600">This report was generated using AI-assisted diagnostic tools</p>
-                            <p class="text-xs text-gray-500">For clinical use under professional medical supervision only</p>
-                        </div>
-                    </div>
-                    <div class="mt-4 pt-4 border-t border-gray-200">
-                        <p class="text-xs text-gray-500 text-center">CONFIDENTIAL: This document contains protected health information. Unauthorized disclosure is prohibited.</p>
-                    </div>
-                </div>
-            </footer>
-        </div>
-
-        <script>
-            // Initialize Plotly with original layout settings
-            var plotData = {{ plot_json|safe }};
-            
-            // Ensure proper sizing and background for the 3D plot
-            plotData.layout.height = 500;
-            plotData.layout.margin = {l: 0, r: 0, b: 0, t: 0, pad: 4};
-            plotData.layout.paper_bgcolor = 'rgba(0,0,0,0)';
-            plotData.layout.scene.bgcolor = 'rgb(240, 240, 240)';
-            
-            Plotly.newPlot('plotly-div', plotData.data, plotData.layout, {
-                responsive: true,
-                displayModeBar: true,
-                modeBarButtonsToRemove: ['toImage', 'sendDataToCloud']
-            });
-            
-            // Ensure proper rendering on window resize
-            window.addEventListener('resize', function() {
-                Plotly.relayout('plotly-div', {
-                    'width': document.getElementById('plotly-div').offsetWidth
-                });
-            });
-        </script>
-    </body>
-    </html>
-    """)
-    return template.render(
-        patient_info=patient_info,
-        tumor_info=tumor_info,
-        img_base64=img_base64,
-        plot_json=plot_3d_json,
-        current_date=current_date,
-        probability_percentage=probability_percentage,
-        severity=severity,
-        severity_color=severity_color,
-        report_id=report_id
-    )
\ No newline at end of file
+def plot_to_json(fig, encoding='json'):
+    """Serialise a figure; "binary" ships coordinate and value arrays as base64 float32 typed arrays."""
+    if encoding != 'binary':
+        return fig.to_json()
+
+    figure = fig.to_plotly_json()
+    for trace in figure['data']:
+        # Surface z grids, and the flattened x/y/z/value points of an isosurface
+        for key in ('x', 'y', 'z', 'value'):
+            array = trace.get(key)
+            if isinstance(array, np.ndarray) and array.ndim in (1, 2) and array.dtype.kind == 'f':
+                typed = {
+                    'dtype': 'f4',
+                    'bdata': base64.b64encode(np.ascontiguousarray(array, dtype='<f4').tobytes()).decode(),
+                }
+                if array.ndim == 2:
+                    typed['shape'] = f'{array.shape[0]}, {array.shape[1]}'
+                trace[key] = typed
+    return json.dumps(figure, cls=PlotlyJSONEncoder)
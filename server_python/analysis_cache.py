@@ -0,0 +1,211 @@
+"""Content-addressed cache of finished MRI analyses.
+
+The key hashes the uploaded bytes together with the CNN's file fingerprint
+and every parameter that changes the output, so re-uploading the same scan
+skips decode, inference, segmentation, encoding and plot building. A new
+model file or different options produce a different key; nothing has to be
+invalidated by hand.
+
+Entries live in a memory tier bounded by bytes (least recently used first
+out) and, with a ``directory``, are also written to disk where every worker
+sharing the directory can read them. A disk hit reads each part once,
+straight into the bytes that are returned. The disk tier is trimmed least
+recently used first to ``disk_max_bytes``.
+"""
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+LOOKUPS = REGISTRY.counter('medisense_analysis_cache_lookups_total', 'Analysis cache lookups by tier that answered.',
+                           ('result',))
+
+# Files are <key>.bin: a 4-byte header length, a JSON header, then the parts back to back
+_HEADER_LENGTH = struct.Struct('<I')
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def cache_key(image_bytes, model_fingerprint, params):
+    """Hex digest of the scan bytes, the model file and the output-affecting ``params`` dict."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b'\0')
+    digest.update(json.dumps([model_fingerprint, params], sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Analysis results keyed by ``cache_key``.
+
+    A value is ``(meta, parts)``: a JSON-serialisable dict and an ordered
+    dict of ``name -> (bytes, content type)``. ``max_bytes`` of 0 disables
+    the cache.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, directory=None, disk_max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory or None
+        self.disk_max_bytes = disk_max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.max_bytes > 0 and self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._disk_entries())
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        """Return ``(meta, parts)`` or None."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.memory_hits += 1
+        if item is not None:
+            LOOKUPS.inc(result='memory')
+            return item[0], item[1]
+
+        item = self._read(key)
+        if item is None:
+            with self._lock:
+                self.misses += 1
+            LOOKUPS.inc(result='miss')
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        LOOKUPS.inc(result='disk')
+        # Promote, so the next hit in this worker skips the file
+        self._remember(key, *item)
+        return item
+
+    def put(self, key, meta, parts):
+        if not self.enabled:
+            return
+        self._remember(key, meta, parts)
+        if self.directory:
+            self._write(key, meta, parts)
+
+    def _remember(self, key, meta, parts):
+        size = sum(len(data) for data, _ in parts.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._items[key] = (meta, parts, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._items.popitem(last=False)
+                self._size -= evicted
+                self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.bin')
+
+    def _write(self, key, meta, parts):
+        layout, offset = [], 0
+        for name, (data, content_type) in parts.items():
+            layout.append([name, content_type, offset, len(data)])
+            offset += len(data)
+        header = json.dumps({'meta': meta, 'parts': layout}).encode()
+
+        path = self._path(key)
+        # Write then rename, so readers in other workers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for data, _ in parts.values():
+                f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._disk_size += _HEADER_LENGTH.size + len(header) + offset
+            trim = self._disk_size > self.disk_max_bytes
+        if trim:
+            self._trim()
+
+    def _read(self, key):
+        if not self.directory or not _KEY_PATTERN.match(key):
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                (header_length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+                header = json.loads(f.read(header_length))
+                parts = OrderedDict()
+                # Parts were written back to back in header order
+                for name, content_type, _, length in header['parts']:
+                    data = f.read(length)
+                    if len(data) != length:
+                        raise ValueError('truncated cache file')
+                    parts[name] = (data, content_type)
+            # Hits refresh mtime, which is what trimming orders by
+            os.utime(path)
+        except (FileNotFoundError, ValueError, struct.error):
+            # Missing, trimmed by another worker, or truncated
+            return None
+        return header['meta'], parts
+
+    def _disk_entries(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.bin'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _trim(self):
+        # Rescan rather than trust the running total; other workers write here too
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._disk_size = total
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'items': len(self._items),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'directory': self.directory,
+                'disk_bytes': self._disk_size,
+                'disk_max_bytes': self.disk_max_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': hits / lookups if lookups else 0.0,
+            }
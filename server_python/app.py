@@ -1,16 +1,73 @@
-from flask import Flask
+import logging
+import os
+import time
+
+from flask import Flask, g, request
 from Routers.modelRouter import modelRouter
 from Routers.server import server
+from Routers.opsRouter import opsRouter
 from flask_cors import CORS
+import serving
+from log import get_logger, log_event
+from metrics import REQUESTS, REQUEST_ERRORS, REQUEST_SECONDS
+import config
 
 
 app = Flask(__name__)
-CORS(app)
+# Only the browser-facing blueprints; the ops endpoints are not meant to be called from pages
+CORS(app, resources={r'/api/.*': {}, r'/model/.*': {}})
+logger = get_logger('http')
 
 app.register_blueprint(modelRouter,url_prefix='/model')
 app.register_blueprint(server,url_prefix='/api')
+app.register_blueprint(opsRouter)
+
+
+def _endpoint():
+    # The route template, not the raw path, keeps label cardinality bounded
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    endpoint = _endpoint()
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    if response.status_code >= 500:
+        REQUEST_ERRORS.inc(endpoint=endpoint)
+    g.request_recorded = True
+    return response
+
+
+@app.teardown_request
+def _record_exception(exc):
+    if exc is not None:
+        # Flask turns unhandled exceptions into a 500 that after_request already counted,
+        # except where they propagate (PROPAGATE_EXCEPTIONS, testing)
+        if not g.get('request_recorded'):
+            REQUEST_ERRORS.inc(endpoint=_endpoint())
+        log_event(logger, 'request failed', logging.ERROR, endpoint=_endpoint(), method=request.method,
+                  error=repr(exc))
 
 
 if __name__ == '__main__':
-    print("Server Started at port : 5000")
-    app.run(debug=True,port=5000)
\ No newline at end of file
+    # Development server only; production runs `gunicorn wsgi:app` (see gunicorn.conf.py).
+    # With the reloader on, this process only watches files and the child it spawns
+    # serves requests, so only the child loads models.
+    debug = os.environ.get('FLASK_DEBUG', '1') not in ('0', 'false', 'False')
+    if config.WARMUP_MODELS and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        serving.warm_up(serving.startup_models())
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        serving.reset_model_control()
+        serving.start_model_watcher()
+    log_event(logger, 'server started', port=5000)
+    try:
+        app.run(debug=debug,port=5000,threaded=True)
+    finally:
+        serving.drain()
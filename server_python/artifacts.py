@@ -0,0 +1,130 @@
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+# Spilled files are named <id>.<ext> so any worker sharing the directory can serve them
+_EXTENSIONS = {
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/jpeg': 'jpg',
+    'application/json': 'json',
+    'application/x-npy': 'npy',
+}
+_CONTENT_TYPES = {ext: content_type for content_type, ext in _EXTENSIONS.items()}
+_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ArtifactStore:
+    """Bytes keyed by random ids, kept in memory up to ``max_bytes``.
+
+    Least recently used artifacts are evicted once the memory budget is
+    exceeded. With a ``spill_dir`` they are written there instead of being
+    dropped, and the directory is trimmed oldest-first to ``spill_max_bytes``.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, spill_dir=None, spill_max_bytes=2 * 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self.spill_max_bytes = spill_max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.spilled = 0
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    def put(self, data, content_type='application/octet-stream'):
+        artifact_id = uuid.uuid4().hex
+        spill = []
+        with self._lock:
+            self._items[artifact_id] = (data, content_type)
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._items) > 1:
+                evicted_id, (evicted, evicted_type) = self._items.popitem(last=False)
+                self._size -= len(evicted)
+                spill.append((evicted_id, evicted, evicted_type))
+
+        if self.spill_dir:
+            for evicted_id, evicted, evicted_type in spill:
+                self._spill(evicted_id, evicted, evicted_type)
+            if spill:
+                self._trim_spill_dir()
+        return artifact_id
+
+    def get(self, artifact_id):
+        """Return ``(data, content_type)`` or None if the id is unknown or evicted."""
+        if not isinstance(artifact_id, str) or not _ID_PATTERN.match(artifact_id):
+            return None
+
+        with self._lock:
+            item = self._items.get(artifact_id)
+            if item is not None:
+                self._items.move_to_end(artifact_id)
+                self.hits += 1
+                return item
+
+        item = self._read_spilled(artifact_id)
+        with self._lock:
+            if item is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return item
+
+    def _spill_path(self, artifact_id, content_type):
+        return os.path.join(self.spill_dir, f'{artifact_id}.{_EXTENSIONS.get(content_type, "bin")}')
+
+    def _spill(self, artifact_id, data, content_type):
+        path = self._spill_path(artifact_id, content_type)
+        # Write then rename, so readers in other workers never see a partial file
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.spilled += 1
+
+    def _read_spilled(self, artifact_id):
+        if not self.spill_dir:
+            return None
+        for ext, content_type in list(_CONTENT_TYPES.items()) + [('bin', 'application/octet-stream')]:
+            path = os.path.join(self.spill_dir, f'{artifact_id}.{ext}')
+            try:
+                with open(path, 'rb') as f:
+                    return f.read(), content_type
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _trim_spill_dir(self):
+        entries = []
+        with os.scandir(self.spill_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'spill_dir': self.spill_dir,
+                'spilled': self.spilled,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,48 @@
+from schema import DIABETES, STRESS, SEPSIS
+
+
+# Model input order, as declared in schema.py
+DIABETES_KEYS = DIABETES.keys
+
+STRESS_KEYS = STRESS.keys
+
+SEPSIS_KEYS = SEPSIS.keys
+
+
+class BatchFormatError(ValueError):
+    """Raised when a batch payload is neither a record array nor a columnar object."""
+
+
+def to_columns(payload, keys):
+    """Normalise a batch payload into (row_count, {key: list of values}).
+
+    Accepts a JSON array of records, ``{"records": [...]}`` or the columnar form
+    ``{"columns": {"Glucose": [...], ...}}``.
+    """
+    if isinstance(payload, dict) and 'records' in payload:
+        payload = payload['records']
+
+    if isinstance(payload, list):
+        columns = {key: [record.get(key) if isinstance(record, dict) else None for record in payload]
+                   for key in keys}
+        return len(payload), columns
+
+    if isinstance(payload, dict) and isinstance(payload.get('columns'), dict):
+        raw = payload['columns']
+        lengths = {len(values) for values in raw.values() if isinstance(values, list)}
+        if len(lengths) > 1:
+            raise BatchFormatError('All columns must have the same length')
+        n_rows = lengths.pop() if lengths else 0
+        columns = {}
+        for key in keys:
+            values = raw.get(key)
+            columns[key] = values if isinstance(values, list) else [None] * n_rows
+        return n_rows, columns
+
+    raise BatchFormatError('Expected a JSON array of records or an object with "records" or "columns"')
+
+
+def iter_chunks(indices, chunk_size):
+    """Yield successive slices of ``indices`` holding at most ``chunk_size`` entries."""
+    for start in range(0, len(indices), chunk_size):
+        yield indices[start:start + chunk_size]
@@ -0,0 +1,44 @@
+"""Brain-tumor CNN latency: Keras predict_on_batch vs converted TFLite models.
+
+Run from server_python/:
+    python -m benchmarks.bench_cnn --tflite PKL/model.tflite PKL/model_int8.tflite [--batch-sizes 1 8 32]
+
+Uses PKL/model.h5 and TFLite files written by `python inference.py convert`.
+"""
+import argparse
+import os
+
+from benchmarks.common import measure, print_table, write_results
+
+import config
+import inference
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keras', default=os.path.join(config.MODEL_DIR, 'model.h5'))
+    parser.add_argument('--tflite', nargs='+', default=[os.path.join(config.MODEL_DIR, config.CNN_TFLITE_MODEL)])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--output', help='write a JSON report here (- for stdout)')
+    args = parser.parse_args()
+
+    backends = [('keras', inference.load_keras(args.keras))]
+    backends += [(os.path.basename(path), inference.TFLiteBackend(path, config.TF_INTRA_OP_THREADS))
+                 for path in args.tflite]
+
+    results = []
+    for batch_size in args.batch_sizes:
+        batch = inference.synthetic_inputs(batch_size)
+        for name, backend in backends:
+            stats = measure(lambda: backend.predict_on_batch(batch), repeat=args.repeat, warmup=3)
+            stats['images_per_s'] = stats['throughput_per_s'] * batch_size
+            results.append({'name': f'{name}[{batch_size}]', 'backend': name, 'batch': batch_size, **stats})
+
+    print_table(results, ['backend', 'batch', 'p50_ms', 'p95_ms', 'p99_ms', 'images_per_s'])
+    if args.output:
+        write_results(args.output, 'cnn', results, vars(args))
+
+
+if __name__ == '__main__':
+    main()
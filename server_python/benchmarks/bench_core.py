@@ -0,0 +1,98 @@
+"""Latency of the core request-path functions, called directly.
+
+Run from server_python/:  python -m benchmarks.bench_core [--sizes 256 512 1024] [--output core.json]
+
+Covers the MRI pipeline stages behind /api/analyze and /api/generate-report,
+and the diabetes, stress and sepsis paths: schema validation and predict for
+a single row as in the handlers, and batches through score_columns. Models
+whose artifacts are missing from MODEL_DIR are skipped. Write the report to
+JSON with --output and compare two runs with benchmarks.compare.
+"""
+import argparse
+import sys
+
+from benchmarks.common import measure, print_table, synthetic_rows, write_results
+from benchmarks.bench_preprocess import synthetic_scan
+
+import config
+from batch import to_columns
+from model import registry
+from report import generate_html_report
+from schema import SCHEMAS
+from scoring import score_columns
+from Routers.server import create_3d_plot, extract_tumor, image_to_base64, load_and_preprocess, plot_to_json
+
+PATIENT = {'name': 'Benchmark Patient', 'age': 54, 'gender': 'Female'}
+TUMOR = {'detected': True, 'probability': 0.82}
+
+# Model name in the registry behind each single-row handler
+SINGLE_ROW_MODELS = {'diabetes': 'diabetes', 'stress': 'stress', 'sepsis': 'sepsis_pipeline'}
+
+
+def mri_cases(size):
+    """(name, fn) pairs for every MRI stage, each fed the previous stage's real output."""
+    image = synthetic_scan(size)
+    processed = load_and_preprocess(image)
+    tumor_array, tumor_mask = extract_tumor(processed)
+    figure = create_3d_plot(processed, tumor_mask)
+    plot_json = plot_to_json(figure)
+    processed_b64 = image_to_base64(processed)
+    tumor_b64 = image_to_base64(tumor_array)
+    return [
+        ('load_and_preprocess', lambda: load_and_preprocess(image)),
+        ('extract_tumor', lambda: extract_tumor(processed)),
+        ('create_3d_plot', lambda: create_3d_plot(processed, tumor_mask)),
+        ('plot_to_json', lambda: plot_to_json(figure, config.SURFACE_ENCODING)),
+        ('image_to_base64', lambda: image_to_base64(processed)),
+        ('generate_html_report',
+         lambda: generate_html_report(PATIENT, TUMOR, processed_b64, tumor_b64, plot_json)),
+    ]
+
+
+def tabular_cases(name, batch_sizes):
+    model = registry.get(SINGLE_ROW_MODELS[name])
+    schema = SCHEMAS[name]
+    record = synthetic_rows(name, 1)[0]
+    row = schema.validate(record)
+    cases = [(f'{name}.validate[1]', lambda: schema.validate(record)),
+             (f'{name}.predict[1]', lambda: model.predict(row))]
+    for batch_size in batch_sizes:
+        records = synthetic_rows(name, batch_size, seed=batch_size)
+        n_rows, columns = to_columns(records, schema.keys)
+        cases.append((f'{name}.score_columns[{batch_size}]',
+                      lambda n_rows=n_rows, columns=columns: score_columns(name, n_rows, columns,
+                                                                           config.BATCH_CHUNK_SIZE)))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 512, 1024], help='MRI sides in pixels')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[64, 1024], help='rows per batch call')
+    parser.add_argument('--repeat', type=int, default=30, help='calls per MRI case')
+    parser.add_argument('--tabular-repeat', type=int, default=200, help='calls per tabular case')
+    parser.add_argument('--output', help='write a JSON report here (- for stdout)')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for name, fn in mri_cases(size):
+            stats = measure(fn, repeat=args.repeat, warmup=2)
+            results.append({'name': f'{name}[{size}]', 'group': 'mri', **stats})
+
+    for name in SINGLE_ROW_MODELS:
+        try:
+            cases = tabular_cases(name, args.batch_sizes)
+        except Exception as e:
+            print(f'Skipping {name}: {e}', file=sys.stderr)
+            continue
+        for case, fn in cases:
+            results.append({'name': case, 'group': 'tabular', **measure(fn, repeat=args.tabular_repeat)})
+
+    print_table(results, ['name', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s'])
+    if args.output:
+        write_results(args.output, 'core', results, vars(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compare the original MRI preprocessing with the fused float32 routine.
+
+Run from server_python/:  python -m benchmarks.bench_preprocess [--sizes 256 512 1024 2048]
+"""
+import argparse
+
+from benchmarks.common import measure, print_table
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+from sklearn.preprocessing import MinMaxScaler
+
+import preprocessing
+
+
+def legacy_preprocess(image):
+    """The original load_and_preprocess + extract_tumor, kept here as the baseline."""
+    img_array = np.array(image.convert('L'))
+    img_array = ndimage.gaussian_filter(img_array, sigma=1.5)
+    p2, p98 = np.percentile(img_array, (2, 98))
+    img_array = np.clip(img_array, p2, p98)
+    img_array = MinMaxScaler().fit_transform(img_array)
+    tumor_mask = img_array > 0.6
+    tumor_array = np.zeros_like(img_array)
+    tumor_array[tumor_mask] = img_array[tumor_mask]
+    return tumor_array, tumor_mask
+
+
+def fused_preprocess(image, max_side=None):
+    return preprocessing.extract_tumor(preprocessing.preprocess_image(image, max_side=max_side))
+
+
+def synthetic_scan(size, seed=0):
+    """Smooth noise with a bright blob, roughly the intensity profile of an MRI slice."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    blob = np.exp(-((x - 0.6) ** 2 + (y - 0.4) ** 2) / 0.01)
+    pixels = 80 + 60 * np.sin(6 * x) * np.cos(4 * y) + 100 * blob + rng.normal(0, 10, (size, size))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode='L').convert('RGB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 512, 1024, 2048])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--max-side', type=int, default=512, help='downsampling target for the third variant')
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        image = synthetic_scan(size)
+        variants = [('legacy', lambda: legacy_preprocess(image)),
+                    ('fused', lambda: fused_preprocess(image))]
+        if size > args.max_side:
+            variants.append((f'fused+downsample({args.max_side})', lambda: fused_preprocess(image, args.max_side)))
+        for name, fn in variants:
+            rows.append({'size': f'{size}x{size}', 'variant': name, **measure(fn, repeat=args.repeat, warmup=2)})
+
+    print_table(rows, ['size', 'variant', 'mean_ms', 'p50_ms', 'p95_ms', 'throughput_per_s'])
+
+
+if __name__ == '__main__':
+    main()
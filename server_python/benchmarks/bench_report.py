@@ -0,0 +1,107 @@
+"""Reports per second: matplotlib + per-call template compile vs the report engine.
+
+Run from server_python/:  python -m benchmarks.bench_report [--size 512] [--threads 4]
+"""
+import argparse
+import base64
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import print_table
+from benchmarks.bench_preprocess import synthetic_scan
+
+import jinja2
+import numpy as np
+from PIL import Image
+
+import preprocessing
+import report
+
+PATIENT = {'name': 'Benchmark Patient', 'age': 54, 'gender': 'Female'}
+TUMOR = {'detected': True, 'probability': 0.82}
+PLOT_JSON = '{"data": [], "layout": {"scene": {}}}'
+
+
+def legacy_report(patient_info, tumor_info, original_b64, tumor_b64, plot_3d_json, template_source):
+    """The original generate_html_report: pyplot comparison figure and an inline Template per call."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    original_img = Image.open(io.BytesIO(base64.b64decode(original_b64)))
+    tumor_img = Image.open(io.BytesIO(base64.b64decode(tumor_b64)))
+    img_buffer = io.BytesIO()
+    plt.figure(figsize=(12, 6))
+    plt.subplot(121)
+    plt.imshow(original_img, cmap='gray')
+    plt.title('Original Image')
+    plt.axis('off')
+    plt.subplot(122)
+    plt.imshow(tumor_img, cmap='gray')
+    plt.title('Extracted Tumor')
+    plt.axis('off')
+    plt.savefig(img_buffer, format='png', bbox_inches='tight', pad_inches=0)
+    plt.close()
+    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
+
+    severity, severity_color = report.severity_for(tumor_info['probability'])
+    return jinja2.Template(template_source).render(
+        patient_info=patient_info, tumor_info=tumor_info, img_base64=img_base64, plot_json=plot_3d_json,
+        current_date='', probability_percentage='82.0%', severity=severity,
+        severity_color=severity_color, report_id='MRI-BENCH'
+    )
+
+
+def encode_png(array):
+    buffered = io.BytesIO()
+    Image.fromarray((array * 255).astype(np.uint8)).save(buffered, format='PNG')
+    return base64.b64encode(buffered.getvalue()).decode()
+
+
+def reports_per_second(fn, count, threads=1):
+    started = time.perf_counter()
+    if threads == 1:
+        for _ in range(count):
+            fn()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda _: fn(), range(count)))
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    processed = preprocessing.preprocess_image(synthetic_scan(args.size))
+    tumor, _ = preprocessing.extract_tumor(processed)
+    images = (encode_png(processed), encode_png(tumor))
+    with open(os.path.join(report.TEMPLATE_DIR, 'report.html')) as f:
+        template_source = f.read()
+
+    rows = []
+    try:
+        fn = lambda: legacy_report(PATIENT, TUMOR, *images, PLOT_JSON, template_source)
+        fn()
+        rows.append({'engine': 'legacy (matplotlib)', 'threads': 1, 'reports_per_s': reports_per_second(fn, args.count)})
+    except ImportError:
+        print('matplotlib not installed, skipping the legacy baseline')
+
+    fn = lambda: report.generate_html_report(PATIENT, TUMOR, *images, PLOT_JSON)
+    fn()
+    rows.append({'engine': 'report engine', 'threads': 1, 'reports_per_s': reports_per_second(fn, args.count)})
+    if args.threads > 1:
+        rows.append({'engine': 'report engine', 'threads': args.threads,
+                     'reports_per_s': reports_per_second(fn, args.count * args.threads, args.threads)})
+
+    print(f'HTML report generation, {args.size}x{args.size} scans\n')
+    print_table(rows, ['engine', 'threads', 'reports_per_s'])
+
+
+if __name__ == '__main__':
+    main()
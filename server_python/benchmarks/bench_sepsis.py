@@ -0,0 +1,71 @@
+"""Compare the DataFrame sepsis path with the array-based SepsisPipeline.
+
+Run from server_python/:  python -m benchmarks.bench_sepsis [--repeat N]
+
+Uses PKL/sepsis.pkl and PKL/scaler.pkl when present, otherwise fits a
+synthetic StandardScaler + RandomForest so the numbers are still comparable.
+That both paths agree bit for bit is checked in tests/test_pipelines.py.
+"""
+import argparse
+import os
+
+from benchmarks.common import measure, print_table
+
+import numpy as np
+import pandas as pd
+
+import config
+from batch import SEPSIS_KEYS
+from pipelines import SepsisPipeline
+
+
+def load_estimators():
+    scaler_path = os.path.join(config.MODEL_DIR, 'scaler.pkl')
+    model_path = os.path.join(config.MODEL_DIR, 'sepsis.pkl')
+    if os.path.exists(scaler_path) and os.path.exists(model_path):
+        import joblib
+        return joblib.load(scaler_path), joblib.load(model_path), 'PKL artifacts'
+
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame(rng.normal(100, 30, (2000, len(SEPSIS_KEYS))), columns=SEPSIS_KEYS)
+    scaler = StandardScaler().fit(train)
+    scaled = pd.DataFrame(scaler.transform(train), columns=SEPSIS_KEYS)
+    model = RandomForestClassifier(n_estimators=50, random_state=0).fit(scaled, scaled['HR'] > 0)
+    return scaler, model, 'synthetic estimators'
+
+
+def dataframe_predict(scaler, model, rows):
+    """The original handler's path: DataFrame -> transform -> DataFrame -> predict."""
+    scaled = scaler.transform(pd.DataFrame(rows, columns=SEPSIS_KEYS))
+    return model.predict(pd.DataFrame(scaled, columns=SEPSIS_KEYS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    scaler, model, source = load_estimators()
+    pipeline = SepsisPipeline(scaler, model, SEPSIS_KEYS)
+    rng = np.random.default_rng(1)
+    print(f'Sepsis prediction latency ({source})\n')
+
+    results = []
+    for batch_size in (1, 64, 1024):
+        rows = rng.normal(100, 30, (batch_size, len(SEPSIS_KEYS)))
+
+        for path, fn in (('dataframe', lambda: dataframe_predict(scaler, model, rows)),
+                         ('pipeline', lambda: pipeline.predict(rows))):
+            stats = measure(fn, repeat=args.repeat)
+            results.append({'rows': batch_size, 'path': path, **stats})
+
+    print_table(results, ['rows', 'path', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+    for batch_size in (1, 64, 1024):
+        before, after = [r['p50_ms'] for r in results if r['rows'] == batch_size]
+        print(f'{batch_size:>5} rows: {before / after:.2f}x faster at p50')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Benchmarks run from server_python/ (python -m benchmarks.<name>) and import the app modules directly
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+
+def measure(fn, repeat=200, warmup=5):
+    """Call ``fn`` ``repeat`` times and return latency statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - started
+    samples *= 1000.0
+    return summarize(samples)
+
+
+def summarize(samples_ms):
+    samples_ms = np.asarray(samples_ms, dtype=np.float64)
+    total_seconds = samples_ms.sum() / 1000.0
+    return {
+        'count': int(samples_ms.size),
+        'mean_ms': float(samples_ms.mean()),
+        'p50_ms': float(np.percentile(samples_ms, 50)),
+        'p95_ms': float(np.percentile(samples_ms, 95)),
+        'p99_ms': float(np.percentile(samples_ms, 99)),
+        'throughput_per_s': samples_ms.size / total_seconds if total_seconds else float('inf'),
+    }
+
+
+# Plausible per-feature ranges (low, high, integer) for synthetic request bodies
+FEATURE_RANGES = {
+    'diabetes': {
+        'Pregnancies': (0, 10, True), 'Glucose': (70, 200, True), 'BloodPressure': (50, 100, True),
+        'SkinThickness': (10, 50, True), 'Insulin': (0, 300, True), 'BMI': (18, 45, True),
+        'DiabetesPedigreeFunction': (0, 2, True), 'Age': (21, 80, True),
+    },
+    'stress': {
+        'Education': (1, 4, True), 'Gender': (1, 3, True), 'Engnat': (1, 2, True), 'Age': (18, 70, True),
+        'Married': (1, 3, True), 'Familysize': (1, 8, True), 'stress_sum': (0, 42, True),
+    },
+    'sepsis': {
+        'Hour': (0, 48, False), 'HR': (60, 130, False), 'O2Sat': (88, 100, False), 'Temp': (35.5, 39.5, False),
+        'MAP': (60, 110, False), 'Resp': (12, 30, False), 'BUN': (5, 40, False), 'Chloride': (95, 115, False),
+        'Creatinine': (0.5, 3, False), 'Glucose': (70, 200, False), 'Hct': (25, 45, False), 'Hgb': (8, 16, False),
+        'WBC': (4, 20, False), 'Platelets': (100, 400, False), 'Age': (18, 90, False),
+        'HospAdmTime': (-50, 0, False), 'ICULOS': (1, 48, False), '0': (0, 1, True), '1': (0, 1, True),
+    },
+}
+
+
+def synthetic_rows(model, count, seed=0):
+    """``count`` request records for ``model`` ('diabetes', 'stress' or 'sepsis') with values in range."""
+    rng = np.random.default_rng(seed)
+    rows = [{} for _ in range(count)]
+    for key, (low, high, integer) in FEATURE_RANGES[model].items():
+        values = rng.integers(low, high + 1, count) if integer else np.round(rng.uniform(low, high, count), 2)
+        for row, value in zip(rows, values.tolist()):
+            row[key] = value
+    return rows
+
+
+def environment():
+    """Where and on what the numbers were measured, so two result files can be compared fairly."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def write_results(path, suite, results, parameters=None):
+    """Write ``results`` (a list of dicts with a unique ``name``) as a JSON report; ``-`` means stdout."""
+    report = {'suite': suite, 'environment': environment(), 'parameters': parameters or {}, 'results': results}
+    text = json.dumps(report, indent=2, default=float)
+    if path == '-':
+        print(text)
+    else:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned text table."""
+    widths = [max(len(col), *(len(_fmt(row.get(col))) for row in rows)) for col in columns]
+    print('  '.join(col.ljust(width) for col, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(_fmt(row.get(col)).ljust(width) for col, width in zip(columns, widths)))
+
+
+def _fmt(value):
+    if isinstance(value, float):
+        return f'{value:.4f}'
+    return '' if value is None else str(value)
@@ -0,0 +1,66 @@
+"""Compare two JSON benchmark reports written with --output.
+
+Run from server_python/:  python -m benchmarks.compare baseline.json current.json [--threshold 10]
+
+Prints p50/p95/p99 and throughput side by side for every result present in
+both files. Exits with status 1 if any p95 got slower, or any throughput
+dropped, by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.common import print_table
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(before, after):
+    """Relative change in percent, positive when ``after`` is larger."""
+    return 100.0 * (after - before) / before if before else 0.0
+
+
+def compare(baseline, current, threshold):
+    """Return the comparison rows and the names of results that regressed."""
+    before = {result['name']: result for result in baseline['results']}
+    rows, regressions = [], []
+    for result in current['results']:
+        old = before.get(result['name'])
+        if old is None:
+            continue
+        row = {'name': result['name']}
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s'):
+            row[metric] = result[metric]
+            row[f'{metric}_change_%'] = change(old[metric], result[metric])
+        if row['p95_ms_change_%'] > threshold or row['throughput_per_s_change_%'] < -threshold:
+            regressions.append(result['name'])
+        rows.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    for label, report in (('baseline', baseline), ('current', current)):
+        env = report['environment']
+        print(f"{label}: {report['suite']} @ {env.get('commit')} ({env.get('timestamp')}, {env.get('cpus')} cpus)")
+    print()
+
+    rows, regressions = compare(baseline, current, args.threshold)
+    print_table(rows, ['name', 'p50_ms', 'p50_ms_change_%', 'p95_ms', 'p95_ms_change_%', 'p99_ms_change_%',
+                       'throughput_per_s', 'throughput_per_s_change_%'])
+    if regressions:
+        print(f'\nRegressed by more than {args.threshold:g}%: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
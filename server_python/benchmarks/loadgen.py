@@ -0,0 +1,226 @@
+"""Closed-loop HTTP load generator for the Flask API.
+
+Run from server_python/:
+    python -m benchmarks.loadgen --url http://127.0.0.1:5000 --concurrency 8 --duration 20
+    python -m benchmarks.loadgen --in-process --scenarios diabetes sepsis-batch analyze --output load.json
+
+Each scenario keeps ``--concurrency`` clients busy for ``--duration`` seconds
+(or ``--requests`` requests) against one endpoint. Bodies are synthetic
+tabular rows and MRI-like PNGs in several sizes, generated once before the
+clock starts. With --in-process the app is served on a local port from this
+process, so no separate server is needed.
+"""
+import argparse
+import http.client
+import io
+import itertools
+import json
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+
+from benchmarks.common import print_table, summarize, synthetic_rows, write_results
+from benchmarks.bench_preprocess import synthetic_scan
+
+SINGLE_ROW = ('diabetes', 'stress', 'sepsis')
+SCENARIOS = ['diabetes', 'stress', 'sepsis', 'diabetes-batch', 'stress-batch', 'sepsis-batch', 'analyze', 'report']
+
+
+def encode_multipart(files):
+    """``files`` is ``[(field, filename, bytes, content type)]``; returns (body, content type header)."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for field, filename, data, content_type in files:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                   f'Content-Type: {content_type}\r\n\r\n'.encode())
+        body.write(data)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+def scan_png(size, seed=0):
+    buffered = io.BytesIO()
+    synthetic_scan(size, seed).save(buffered, format='PNG')
+    return buffered.getvalue()
+
+
+class Client:
+    """One keep-alive connection; reconnects after errors."""
+
+    def __init__(self, url, timeout):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request and return ``(status, response body)``."""
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self._connection.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = self._connection.getresponse()
+            return response.status, response.read()
+        except Exception:
+            self._connection.close()
+            self._connection = None
+            raise
+
+
+def row_requests(scenario, seed, block=256):
+    """An endless stream of single-row requests drawn fresh rather than cycled.
+
+    The single-row endpoints cache results by feature values, so cycling a
+    fixed pool would measure ``ResultCache`` hits after the first pass. Each
+    block is drawn from ``seed`` (a tuple of ints) plus its block number instead.
+    """
+    for offset in itertools.count():
+        for row in synthetic_rows(scenario, block, seed=(*seed, offset)):
+            yield 'POST', f'/model/{scenario}', json.dumps(row).encode(), {'Content-Type': 'application/json'}
+
+
+def build_requests(scenario, client, args):
+    """A list of ``(method, path, body, headers)`` tuples the clients cycle through."""
+    if scenario.endswith('-batch'):
+        name = scenario[:-len('-batch')]
+        body = json.dumps(synthetic_rows(name, args.batch_rows)).encode()
+        return [('POST', f'/model/{name}/batch', body, {'Content-Type': 'application/json'})]
+
+    if scenario == 'analyze':
+        requests = []
+        for size in args.image_sizes:
+            body, content_type = encode_multipart([('image', f'scan{size}.png', scan_png(size), 'image/png')])
+            requests.append(('POST', '/api/analyze', body, {'Content-Type': content_type}))
+        return requests
+
+    if scenario == 'report':
+        # One analysis up front supplies the report inputs; the full payload keeps this valid across workers
+        body, content_type = encode_multipart([('image', 'scan.png', scan_png(args.image_sizes[0]), 'image/png')])
+        status, data = client.request('POST', '/api/analyze', body, {'Content-Type': content_type})
+        if status != 200:
+            raise RuntimeError(f'/api/analyze returned {status} while preparing the report scenario')
+        analysis = json.loads(data)
+        payload = {
+            'patient_info': {'name': 'Load Test', 'age': 54, 'gender': 'Female'},
+            'tumor_info': {'detected': analysis['probability'] > 0.5, 'probability': analysis['probability']},
+            'images': {'original': analysis['processed_image'], 'tumor': analysis['tumor_image']},
+            'plot_3d': analysis['plot_3d'],
+        }
+        return [('POST', '/api/generate-report', json.dumps(payload).encode(), {'Content-Type': 'application/json'})]
+
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def run_scenario(scenario, args):
+    if scenario in SINGLE_ROW:
+        # A fresh seed per run too, so a second run against the same server is not served from its cache
+        run_seed = uuid.uuid4().int
+    else:
+        requests = build_requests(scenario, Client(args.url, args.timeout), args)
+    stop = threading.Event()
+    remaining = itertools.count() if args.requests is None else iter(range(args.requests))
+    remaining_lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    results_lock = threading.Lock()
+
+    def worker(index):
+        client = Client(args.url, args.timeout)
+        if scenario in SINGLE_ROW:
+            cycle = row_requests(scenario, (run_seed, index))
+        else:
+            cycle = itertools.cycle(requests[index % len(requests):] + requests[:index % len(requests)])
+        for _ in range(args.warmup):
+            method, path, body, headers = next(cycle)
+            try:
+                client.request(method, path, body, headers)
+            except Exception:
+                pass
+        barrier.wait()
+        while True:
+            with remaining_lock:
+                if stop.is_set() or next(remaining, None) is None:
+                    return
+            method, path, body, headers = next(cycle)
+            started = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body, headers)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with results_lock:
+                latencies.append(elapsed_ms)
+                statuses[status] += 1
+
+    # Every client finishes its warm-up before the clock starts
+    barrier = threading.Barrier(args.concurrency + 1)
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    if args.requests is None:
+        time.sleep(args.duration)
+        stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {'name': scenario, 'concurrency': args.concurrency, **summarize(latencies or [0.0])}
+    errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+    result.update({
+        'count': len(latencies),
+        'elapsed_s': elapsed,
+        # Closed loop: throughput is completed requests over wall-clock time, not 1 / latency
+        'throughput_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'error_rate': errors / len(latencies) if latencies else 0.0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    })
+    return result
+
+
+def serve_in_process():
+    """Serve the app on a free local port from a background thread; returns the base URL."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='base URL of a running server')
+    parser.add_argument('--in-process', action='store_true', help='start the app in this process instead')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--concurrency', type=int, default=4, help='clients with one request in flight each')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--requests', type=int, help='stop after this many requests instead of --duration')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed requests per client before measuring')
+    parser.add_argument('--image-sizes', type=int, nargs='+', default=[256, 512, 1024])
+    parser.add_argument('--batch-rows', type=int, default=1000, help='rows per */batch request')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='write a JSON report here (- for stdout)')
+    args = parser.parse_args()
+
+    if args.in_process:
+        args.url = serve_in_process()
+
+    results = [run_scenario(scenario, args) for scenario in args.scenarios]
+    print_table(results, ['name', 'count', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s', 'error_rate'])
+    if args.output:
+        write_results(args.output, 'http', results, vars(args))
+
+
+if __name__ == '__main__':
+    main()
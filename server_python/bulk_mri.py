@@ -0,0 +1,210 @@
+"""Run the brain-tumor classifier over a directory of MRI scans.
+
+    python bulk_mri.py /data/scans -o results.jsonl --batch-size 32 --segment
+
+Images are decoded and resized on a thread pool that keeps a few batches
+ahead of the model. The CNN sees fixed-size batches. With ``--segment`` each
+scan also goes through the same preprocessing and tumor extraction as
+/api/analyze. One JSON object per scan is written as JSON Lines, in input
+order, and progress with an ETA is printed to stderr.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import config
+import preprocessing
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+def tumor_predictor():
+    """``(predict_fn, version)`` for one CNN version, picked like ``/api/analyze`` picks it.
+
+    With a candidate loaded, each call to this function lands on the current
+    or the candidate version; every batch ``predict_fn`` runs is timed
+    against that version.
+    """
+    from model import registry
+    cnn, version = registry.get_versioned('brain_tumor')
+
+    def predict(batch):
+        with registry.timed('brain_tumor', version):
+            return cnn.predict_on_batch(batch)[:, 0]
+
+    return predict, version
+
+
+def predict_tumor_batch(batch):
+    """Tumor probability for each image in a (n, 224, 224, ...) batch; each batch picks its own version."""
+    predict, _ = tumor_predictor()
+    return predict(batch)
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {value}')
+    return value
+
+
+def find_images(root):
+    """Image files below ``root`` as ``(relative name, opener)`` sources, sorted by path."""
+    paths = []
+    for directory, _, files in os.walk(root):
+        paths.extend(os.path.join(directory, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [(os.path.relpath(path, root), (lambda path=path: open(path, 'rb'))) for path in sorted(paths)]
+
+
+def _load(source, segment, threshold):
+    """Decode one scan into the model input plus its (partial) result record."""
+    name, opener = source
+    try:
+        with opener() as f:
+            img = Image.open(f)
+            img.load()
+        result = {'name': name}
+        model_input = np.array(img.resize((224, 224))) / 255.0
+        if segment:
+            processed = preprocessing.preprocess_image(img, max_side=config.PREPROCESS_MAX_SIDE)
+            _, tumor_mask = preprocessing.extract_tumor(processed, threshold)
+            result['tumor_fraction'] = float(tumor_mask.mean())
+            result['tumor_mean_intensity'] = float(processed[tumor_mask].mean()) if tumor_mask.any() else 0.0
+        return model_input, result
+    except Exception as e:
+        return None, {'name': name, 'error': str(e)}
+
+
+def _decoded_batches(sources, batch_size, workers, prefetch, segment, threshold):
+    """Yield lists of decoded scans while up to ``prefetch`` further batches decode in the background."""
+    sources = iter(sources)
+    window = batch_size * (prefetch + 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mri-decode') as pool:
+        pending = deque()
+
+        def fill():
+            while len(pending) < window:
+                source = next(sources, None)
+                if source is None:
+                    return
+                pending.append(pool.submit(_load, source, segment, threshold))
+
+        fill()
+        while pending:
+            batch = [pending.popleft().result() for _ in range(min(batch_size, len(pending)))]
+            fill()
+            yield batch
+
+
+def _predict_fixed(predict_fn, inputs, batch_size):
+    """Predict in fixed-size batches, zero-padding the last one so the model sees one input shape."""
+    stacked = np.stack(inputs)
+    if len(stacked) < batch_size:
+        padding = np.zeros((batch_size - len(stacked),) + stacked.shape[1:], dtype=stacked.dtype)
+        stacked = np.concatenate([stacked, padding])
+    return np.asarray(predict_fn(stacked))[:len(inputs)]
+
+
+class Progress:
+    """Counts processed scans and prints throughput and ETA at most every ``interval`` seconds."""
+
+    def __init__(self, total=None, stream=sys.stderr, interval=2.0):
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+
+    def update(self, count, errors=0):
+        self.done += count
+        self.errors += errors
+        now = time.perf_counter()
+        if self.stream is not None and (now - self._last_report >= self.interval or self.done == self.total):
+            self._last_report = now
+            print(self.describe(), file=self.stream)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        summary = {'processed': self.done, 'errors': self.errors, 'elapsed_seconds': round(elapsed, 3),
+                   'images_per_second': round(rate, 2)}
+        if self.total is not None:
+            summary['total'] = self.total
+            summary['eta_seconds'] = round((self.total - self.done) / rate, 1) if rate else None
+        return summary
+
+    def describe(self):
+        summary = self.summary()
+        text = f"{summary['processed']}"
+        if self.total is not None:
+            text += f"/{self.total} ({100.0 * self.done / self.total if self.total else 100.0:.1f}%)"
+        text += f" scans, {summary['images_per_second']:.1f} img/s"
+        if summary.get('eta_seconds') is not None:
+            text += f", ETA {summary['eta_seconds']:.0f}s"
+        return text
+
+
+def scan(sources, predict_fn=predict_tumor_batch, batch_size=32, workers=None, prefetch=2,
+         segment=False, threshold=0.6, progress=None):
+    """Yield one result dict per source, in input order."""
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+    workers = workers or os.cpu_count() or 1
+    for batch in _decoded_batches(sources, batch_size, workers, prefetch, segment, threshold):
+        # Scans of different shapes (grayscale vs RGB) cannot share a tensor
+        groups = {}
+        for model_input, result in batch:
+            if model_input is not None:
+                groups.setdefault(model_input.shape, []).append((model_input, result))
+        for items in groups.values():
+            try:
+                probabilities = _predict_fixed(predict_fn, [model_input for model_input, _ in items], batch_size)
+            except Exception as e:
+                for _, result in items:
+                    result['error'] = str(e)
+                continue
+            for (_, result), probability in zip(items, probabilities):
+                result['probability'] = float(probability)
+
+        if progress is not None:
+            progress.update(len(batch), errors=sum(1 for _, result in batch if 'error' in result))
+        for _, result in batch:
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help='directory searched recursively for scans')
+    parser.add_argument('-o', '--output', default='-', help='JSON Lines output file (default: stdout)')
+    parser.add_argument('--batch-size', type=positive_int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='decode threads')
+    parser.add_argument('--prefetch', type=int, default=2, help='batches decoded ahead of the model')
+    parser.add_argument('--segment', action='store_true', help='also run preprocessing and tumor extraction')
+    parser.add_argument('--threshold', type=float, default=0.6, help='tumor extraction threshold')
+    args = parser.parse_args(argv)
+
+    sources = find_images(args.directory)
+    progress = Progress(total=len(sources))
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for result in scan(sources, batch_size=args.batch_size, workers=args.workers, prefetch=args.prefetch,
+                           segment=args.segment, threshold=args.threshold, progress=progress):
+            output.write(json.dumps(result) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(progress.summary()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
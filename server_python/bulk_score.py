@@ -0,0 +1,168 @@
+"""Score a CSV or Parquet file with one of the bundled tabular models.
+
+    python bulk_score.py diabetes cohort.csv -o predictions.csv
+    python bulk_score.py sepsis icu.parquet -o sepsis.parquet --workers 8 --id-column PatientID
+
+The input is read in chunks and scored on a process pool with the same feature
+order, validation and clinical shortcut as the /model/<name>/batch endpoint.
+Predictions are written as each chunk finishes, in input order, so memory use
+stays flat however large the file is.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import config
+from schema import SCHEMAS
+from scoring import BATCH_MODELS, score_columns
+
+
+def _format(path, override=None):
+    if override:
+        return override
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+# Nullable dtypes keep the output schema identical for every chunk, even all-invalid ones
+PREDICTION_DTYPES = {'diabetes': 'boolean', 'stress': 'string', 'sepsis': 'boolean'}
+
+
+def read_chunks(path, columns, chunk_rows, file_format, id_columns=()):
+    """Yield DataFrames of at most ``chunk_rows`` rows holding only ``columns`` (those present)."""
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        present = [name for name in columns if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=present):
+            yield batch.to_pandas()
+    else:
+        wanted = set(columns)
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=lambda name: name in wanted,
+                               dtype={column: str for column in id_columns})
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.format = file_format
+        self._parquet = None
+        self._first = True
+
+    def write(self, frame):
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_chunk(name, frame, id_columns, start_row, chunk_size):
+    """Score one DataFrame chunk; runs inside a worker process."""
+    keys = SCHEMAS[name].keys
+    n_rows = len(frame)
+    columns = {key: frame[key].to_numpy() if key in frame else [None] * n_rows for key in keys}
+    results = score_columns(name, n_rows, columns, chunk_size)
+
+    output = pd.DataFrame({'row': range(start_row, start_row + n_rows)})
+    for column in id_columns:
+        if column in frame:
+            output[column] = frame[column].astype('string').to_numpy()
+    output['prediction'] = pd.array([result.get('prediction') for result in results], dtype=PREDICTION_DTYPES[name])
+    output['error'] = pd.array([result.get('error') for result in results], dtype='string')
+    return output
+
+
+def _warm_up(name):
+    # Load artifacts once per worker, before the first chunk arrives
+    from model import registry
+    registry.warm_up(['sepsis_pipeline'] if name == 'sepsis' else [name])
+
+
+def run(name, input_path, output_path, chunk_rows, workers, id_columns, predict_chunk_size,
+        input_format=None, output_format=None, progress=sys.stderr):
+    keys = SCHEMAS[name].keys
+    reader = read_chunks(input_path, list(dict.fromkeys(keys + id_columns)), chunk_rows,
+                         _format(input_path, input_format), id_columns)
+    writer = ChunkWriter(output_path, _format(output_path, output_format))
+
+    started = time.perf_counter()
+    rows = 0
+    errors = 0
+
+    def report(final=False):
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else 0.0
+        label = 'Done' if final else 'Scored'
+        print(f'{label}: {rows} rows ({errors} invalid) in {elapsed:.1f}s, {rate:,.0f} rows/sec', file=progress)
+
+    def consume(output):
+        nonlocal rows, errors
+        writer.write(output)
+        rows += len(output)
+        errors += int(output['error'].notna().sum())
+        report()
+
+    try:
+        if workers <= 0:
+            _warm_up(name)
+            start_row = 0
+            for frame in reader:
+                consume(score_chunk(name, frame, id_columns, start_row, predict_chunk_size))
+                start_row += len(frame)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_warm_up, initargs=(name,)) as pool:
+                # At most two chunks per worker in flight keeps memory bounded
+                pending = deque()
+                start_row = 0
+                for frame in reader:
+                    pending.append(pool.submit(score_chunk, name, frame, id_columns, start_row, predict_chunk_size))
+                    start_row += len(frame)
+                    if len(pending) >= 2 * workers:
+                        consume(pending.popleft().result())
+                while pending:
+                    consume(pending.popleft().result())
+    finally:
+        writer.close()
+
+    report(final=True)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('model', choices=sorted(BATCH_MODELS))
+    parser.add_argument('input', help='CSV or Parquet file with one column per model feature')
+    parser.add_argument('-o', '--output', required=True, help='CSV or Parquet file to write predictions to')
+    parser.add_argument('--chunk-rows', type=int, default=50000, help='rows read and sent to a worker at a time')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (0 scores in this process)')
+    parser.add_argument('--id-column', action='append', default=[], dest='id_columns',
+                        help='input column copied to the output, may be repeated')
+    parser.add_argument('--predict-chunk-size', type=int, default=config.BATCH_CHUNK_SIZE,
+                        help='rows per model.predict call inside a worker')
+    parser.add_argument('--input-format', choices=['csv', 'parquet'])
+    parser.add_argument('--output-format', choices=['csv', 'parquet'])
+    args = parser.parse_args(argv)
+
+    run(args.model, args.input, args.output, args.chunk_rows, args.workers, args.id_columns,
+        args.predict_chunk_size, args.input_format, args.output_format)
+
+
+if __name__ == '__main__':
+    main()
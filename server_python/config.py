@@ -0,0 +1,129 @@
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+# Batch prediction
+# Rows scored per model.predict call on the /model/<name>/batch endpoints
+BATCH_CHUNK_SIZE = _env_int('BATCH_CHUNK_SIZE', 1024)
+# Hard limit on rows accepted in one batch request
+BATCH_MAX_ROWS = _env_int('BATCH_MAX_ROWS', 100000)
+
+# Brain-tumor inference scheduler
+# Largest number of /api/analyze requests combined into one forward pass
+INFERENCE_MAX_BATCH_SIZE = _env_int('INFERENCE_MAX_BATCH_SIZE', 8)
+# How long the first queued request waits for others before the batch is flushed
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5))
+
+# Model artifacts
+MODEL_DIR = os.environ.get('MODEL_DIR', './PKL')
+# Comma separated registry names loaded at startup, e.g. "diabetes,stress" or "all"
+WARMUP_MODELS = [name.strip() for name in os.environ.get('WARMUP_MODELS', '').split(',') if name.strip()]
+# Seconds between checks of the loaded models' files; a changed file is reloaded (0 disables)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 10))
+# File through which reloads, candidates and promotions reach every worker on the next
+# watcher poll; must be writable and shared by all workers ('' keeps them per process)
+MODEL_CONTROL_FILE = os.environ.get('MODEL_CONTROL_FILE', os.path.join(MODEL_DIR, '.model-control.json'))
+# Bearer token required by the POST/PUT/DELETE /models endpoints ('' disables them)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# Brain-tumor CNN backend: "keras" (model.h5) or "tflite" (converted with `python inference.py convert`)
+CNN_BACKEND = os.environ.get('CNN_BACKEND', 'keras')
+CNN_TFLITE_MODEL = os.environ.get('CNN_TFLITE_MODEL', 'model.tflite')
+
+# Sepsis rule-based shortcut: comma separated rules; a row matching any of them is reported
+# as sepsis without running the model. Values are compared truncated to integers. '' disables it.
+SEPSIS_PREFILTER = os.environ.get('SEPSIS_PREFILTER', 'HR>120,HR<90,Platelets<150')
+
+# Tabular prediction result cache
+# Entries kept across /model/diabetes, /model/stress and /model/sepsis (0 disables the cache)
+RESULT_CACHE_SIZE = _env_int('RESULT_CACHE_SIZE', 4096)
+# Seconds before a cached prediction expires (0 keeps it until evicted)
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 300))
+
+# MRI preprocessing
+# Downsample uploads so their longest side is at most this many pixels before filtering (0 keeps full size)
+PREPROCESS_MAX_SIDE = _env_int('PREPROCESS_MAX_SIDE', 0)
+
+# 3D surface payload for /api/analyze
+# Longest side of the surface grid after area-averaged downsampling (0 sends full resolution)
+SURFACE_GRID_SIZE = _env_int('SURFACE_GRID_SIZE', 128)
+# Decimal places kept for z values in the JSON encoding
+SURFACE_DECIMALS = _env_int('SURFACE_DECIMALS', 4)
+# "json" (plain number lists) or "binary" (base64 float32 typed array, needs plotly.js >= 2.28)
+SURFACE_ENCODING = os.environ.get('SURFACE_ENCODING', 'json')
+
+# Images returned by /api/analyze and embedded in reports
+# "png" (lossless), "webp" or "jpeg" (lossy, much smaller; fine for previews)
+IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'png')
+# zlib effort 0-9; 1 encodes ~5x faster than Pillow's default 6 for ~15% larger files
+IMAGE_PNG_COMPRESS_LEVEL = _env_int('IMAGE_PNG_COMPRESS_LEVEL', 1)
+# WebP/JPEG quality 1-100
+IMAGE_QUALITY = _env_int('IMAGE_QUALITY', 80)
+# Longest side of returned images in pixels (0 keeps the processed resolution)
+IMAGE_THUMBNAIL_SIZE = _env_int('IMAGE_THUMBNAIL_SIZE', 0)
+# Format of the comparison image embedded in HTML reports
+REPORT_IMAGE_FORMAT = os.environ.get('REPORT_IMAGE_FORMAT', 'png')
+
+# Asynchronous analysis jobs (/api/analyze/jobs)
+JOB_WORKERS = _env_int('JOB_WORKERS', 2)
+# Queued + running jobs allowed before new submissions get 503
+JOB_MAX_PENDING = _env_int('JOB_MAX_PENDING', 16)
+# Seconds a finished job's results stay available
+JOB_TTL = _env_int('JOB_TTL', 600)
+# Finished jobs kept for collection at most; the oldest are dropped first
+JOB_MAX_FINISHED = _env_int('JOB_MAX_FINISHED', 64)
+
+# Server-side artifact store for analysis images and plots
+ARTIFACT_MAX_BYTES = _env_int('ARTIFACT_MAX_BYTES', 256 * 1024 * 1024)
+# Directory evicted artifacts are written to instead of being dropped ('' disables spilling)
+ARTIFACT_SPILL_DIR = os.environ.get('ARTIFACT_SPILL_DIR', '')
+ARTIFACT_SPILL_MAX_BYTES = _env_int('ARTIFACT_SPILL_MAX_BYTES', 2 * 1024 * 1024 * 1024)
+
+# Finished /analyze results keyed by image hash, model file and parameters (0 disables the cache)
+ANALYSIS_CACHE_MAX_BYTES = _env_int('ANALYSIS_CACHE_MAX_BYTES', 128 * 1024 * 1024)
+# Directory for the on-disk tier, shared by workers ('' keeps results in memory only)
+ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', '')
+ANALYSIS_CACHE_DISK_MAX_BYTES = _env_int('ANALYSIS_CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024)
+
+# Bulk MRI scanning (bulk_mri.py and /api/analyze/bulk)
+BULK_BATCH_SIZE = _env_int('BULK_BATCH_SIZE', 32)
+# Decode threads (0 uses one per CPU)
+BULK_DECODE_WORKERS = _env_int('BULK_DECODE_WORKERS', 0)
+# Limits for /api/analyze/bulk, checked before anything is decoded: request body size,
+# number of scans, and total uncompressed size of the zip members
+BULK_MAX_UPLOAD_BYTES = _env_int('BULK_MAX_UPLOAD_BYTES', 512 * 1024 * 1024)
+BULK_MAX_FILES = _env_int('BULK_MAX_FILES', 10000)
+BULK_MAX_UNCOMPRESSED_BYTES = _env_int('BULK_MAX_UNCOMPRESSED_BYTES', 2 * 1024 * 1024 * 1024)
+
+# Volumetric MRI analysis (/api/analyze/volume and volume.py)
+VOLUME_BATCH_SIZE = _env_int('VOLUME_BATCH_SIZE', 16)
+# Slice threads (0 uses one per CPU)
+VOLUME_WORKERS = _env_int('VOLUME_WORKERS', 0)
+# Isosurface points per axis after decimation
+VOLUME_GRID_SIZE = _env_int('VOLUME_GRID_SIZE', 48)
+# Volume score from slice probabilities: max, mean or top_k_mean
+VOLUME_AGGREGATE = os.environ.get('VOLUME_AGGREGATE', 'top_k_mean')
+VOLUME_TOP_K = _env_int('VOLUME_TOP_K', 3)
+# Where uploaded volumes are written so they can be memory mapped ('' uses the system temp dir)
+VOLUME_TMP_DIR = os.environ.get('VOLUME_TMP_DIR', '')
+
+# Structured logging (JSON lines on stderr)
+LOG_ENABLED = os.environ.get('LOG_ENABLED', '1') not in ('0', 'false', 'False')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Production serving (gunicorn, see gunicorn.conf.py)
+SERVE_BIND = os.environ.get('SERVE_BIND', '0.0.0.0:5000')
+# Jobs, artifacts, caches, the CNN scheduler and metrics live in each worker's memory, so more
+# than one worker needs sticky sessions in front of it (see README)
+SERVE_WORKERS = _env_int('SERVE_WORKERS', 1)
+# Request threads per worker
+SERVE_THREADS = _env_int('SERVE_THREADS', 8)
+# Seconds in-flight requests and analysis jobs get to finish after SIGTERM
+SHUTDOWN_TIMEOUT = _env_int('SHUTDOWN_TIMEOUT', 30)
+# TensorFlow thread pools per process (0 keeps TensorFlow's default; gunicorn.conf.py
+# splits the CPUs across workers when these are unset)
+TF_INTRA_OP_THREADS = _env_int('TF_INTRA_OP_THREADS', 0)
+TF_INTER_OP_THREADS = _env_int('TF_INTER_OP_THREADS', 0)
@@ -0,0 +1,101 @@
+import io
+import time
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+import config
+from metrics import REGISTRY
+from preprocessing import downsample
+
+# format -> (PIL format name, content type)
+FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+ENCODE_SECONDS = REGISTRY.histogram('medisense_image_encode_seconds', 'Time to encode one output image.', ('format',))
+ENCODED_BYTES = REGISTRY.histogram('medisense_image_encoded_bytes', 'Size of one encoded output image.', ('format',),
+                                   buckets=(4096, 16384, 65536, 262144, 1048576, 4194304))
+
+# Uncompressed pixels kept server-side, never sent to the browser
+RAW_CONTENT_TYPE = 'application/x-npy'
+
+ImageOptions = namedtuple('ImageOptions', ['format', 'compress_level', 'quality', 'thumbnail'])
+
+
+def default_options():
+    return ImageOptions(config.IMAGE_FORMAT, config.IMAGE_PNG_COMPRESS_LEVEL, config.IMAGE_QUALITY,
+                        config.IMAGE_THUMBNAIL_SIZE)
+
+
+def options_from_args(args, defaults=None):
+    """ImageOptions from request query arguments, falling back to ``defaults``; raises ValueError."""
+    defaults = defaults or default_options()
+    options = ImageOptions(
+        args.get('image_format', defaults.format).lower(),
+        args.get('png_compress_level', defaults.compress_level, type=int),
+        args.get('image_quality', defaults.quality, type=int),
+        args.get('thumbnail', defaults.thumbnail, type=int),
+    )
+    if options.format not in FORMATS:
+        raise ValueError(f'image_format must be one of {", ".join(FORMATS)}')
+    if not 0 <= options.compress_level <= 9:
+        raise ValueError('png_compress_level must be between 0 and 9')
+    if not 1 <= options.quality <= 100:
+        raise ValueError('image_quality must be between 1 and 100')
+    return options
+
+
+def is_archival(options):
+    """Whether ``options`` keep every pixel: lossless PNG at full size."""
+    return options.format == 'png' and not options.thumbnail
+
+
+def encode_raw(image):
+    """A [0, 1] float array as full-size uint8 ``.npy`` bytes: lossless, and costs about one copy."""
+    buffered = io.BytesIO()
+    np.save(buffered, np.multiply(image, 255, dtype=np.float32).astype(np.uint8), allow_pickle=False)
+    return buffered.getvalue()
+
+
+def decode_image(data, content_type):
+    """A PIL image from ``encode_raw`` output or from any image format PIL reads."""
+    if content_type == RAW_CONTENT_TYPE:
+        return Image.fromarray(np.load(io.BytesIO(data), allow_pickle=False))
+    return Image.open(io.BytesIO(data))
+
+
+def content_type(options):
+    return FORMATS[options.format][1]
+
+
+def _save_arguments(options):
+    if options.format == 'png':
+        return {'compress_level': options.compress_level}
+    if options.format == 'webp':
+        # method=0 is libwebp's fastest setting; higher methods spend 3-4x longer for a few % smaller files
+        return {'quality': options.quality, 'method': 0}
+    return {'quality': options.quality}
+
+
+def encode_image(image, options=None):
+    """Encode a PIL image or a [0, 1] float array; returns ``(bytes, content type, seconds)``."""
+    options = options or default_options()
+    started = time.perf_counter()
+    if not isinstance(image, Image.Image):
+        image = Image.fromarray(np.multiply(image, 255, dtype=np.float32).astype(np.uint8))
+    if options.thumbnail:
+        image = downsample(image, options.thumbnail)
+    if options.format == 'jpeg' and image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    buffered = io.BytesIO()
+    image.save(buffered, format=FORMATS[options.format][0], **_save_arguments(options))
+    data = buffered.getvalue()
+    elapsed = time.perf_counter() - started
+
+    ENCODE_SECONDS.observe(elapsed, format=options.format)
+    ENCODED_BYTES.observe(len(data), format=options.format)
+    return data, content_type(options), elapsed
@@ -0,0 +1,71 @@
+"""gunicorn settings, picked up automatically when started from server_python/:
+
+    gunicorn wsgi:app
+
+Workers, threads and TensorFlow thread pools come from config.py (env vars).
+"""
+import gc
+import os
+import signal
+
+# Not `import config`: gunicorn would read that name as its own `config` setting
+import config as app_config
+
+bind = app_config.SERVE_BIND
+# One worker by default: job ids, artifact ids and /metrics are only known to the worker that made them
+workers = app_config.SERVE_WORKERS
+worker_class = 'gthread'
+threads = app_config.SERVE_THREADS
+# Import the app and load the scikit-learn models once, in the master, and share them via fork
+preload_app = True
+# /api/analyze on a cold CNN can take well over gunicorn's default 30s
+timeout = 120
+graceful_timeout = app_config.SHUTDOWN_TIMEOUT
+keepalive = 5
+
+# Split the cores between workers so BLAS/OpenMP and TensorFlow pools don't oversubscribe them.
+# Set here because these are read when numpy and TensorFlow are first imported.
+_threads_per_worker = max(1, (os.cpu_count() or 1) // max(1, workers))
+os.environ.setdefault('OMP_NUM_THREADS', str(_threads_per_worker))
+os.environ.setdefault('OPENBLAS_NUM_THREADS', str(_threads_per_worker))
+os.environ.setdefault('MKL_NUM_THREADS', str(_threads_per_worker))
+if 'TF_INTRA_OP_THREADS' not in os.environ:
+    app_config.TF_INTRA_OP_THREADS = _threads_per_worker
+if 'TF_INTER_OP_THREADS' not in os.environ:
+    # Requests are already parallel across threads and workers
+    app_config.TF_INTER_OP_THREADS = 1
+
+
+def on_starting(server):
+    import serving
+
+    # Before any worker forks, so none of them picks up an earlier run's candidates
+    serving.reset_model_control()
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's view, so a GC pass in a worker
+    # doesn't touch (and un-share) the preloaded model objects
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    import serving
+
+    # SIGTERM: report not-ready straight away, then let gunicorn stop accepting and finish requests
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_term(signum, frame):
+        serving.begin_drain()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_term)
+    serving.warm_up_in_background()
+    # Watcher threads would not survive the fork, so each worker starts its own
+    serving.start_model_watcher()
+
+
+def worker_exit(server, worker):
+    import serving
+    serving.drain()
@@ -0,0 +1,253 @@
+"""CPU inference backends for the brain-tumor CNN.
+
+Each backend exposes ``predict_on_batch(batch)`` with the same (n, 1)
+output as the Keras model, so callers do not care which one is loaded.
+Choose one with ``CNN_BACKEND``:
+
+* ``keras``  - the original ``model.h5`` through Keras
+* ``tflite`` - a converted ``.tflite`` file run by the TFLite interpreter
+
+Convert once and check the converted model against Keras with:
+
+    python inference.py convert --quantization dynamic --check-dir /data/scans
+    python inference.py check --check-dir /data/scans
+
+Conversion exits with status 1 if the converted model disagrees with Keras
+beyond ``--max-abs-diff`` or ``--min-agreement``, and then the file is not
+written.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+import config
+
+BACKENDS = ('keras', 'tflite')
+QUANTIZATIONS = ('none', 'float16', 'dynamic', 'int8')
+INPUT_SIZE = (224, 224)
+
+
+def _set_tf_threads(tf):
+    # Only takes effect before TensorFlow's runtime starts, which is why it lives next to the import
+    if config.TF_INTRA_OP_THREADS:
+        tf.config.threading.set_intra_op_parallelism_threads(config.TF_INTRA_OP_THREADS)
+    if config.TF_INTER_OP_THREADS:
+        tf.config.threading.set_inter_op_parallelism_threads(config.TF_INTER_OP_THREADS)
+
+
+def load_keras(path):
+    # Imported here so processes that never touch the CNN don't pay for TensorFlow
+    import tensorflow as tf
+    _set_tf_threads(tf)
+    return tf.keras.models.load_model(path)
+
+
+def _interpreter_class():
+    # The standalone tflite-runtime wheel is a few MB; fall back to the copy inside TensorFlow
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        _set_tf_threads(tf)
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend:
+    """A ``.tflite`` model behind the Keras ``predict_on_batch`` interface.
+
+    Resizing an interpreter's input re-plans its tensors, which costs more
+    than a small forward pass. Batches are therefore zero-padded up to the
+    next power of two, and each of those sizes gets its own interpreter,
+    allocated once. An interpreter is not thread-safe, so calls are
+    serialised per size. Int8 inputs and outputs are (de)quantized here.
+    """
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.num_threads = num_threads or None
+        self._interpreters = {}
+        self._lock = threading.Lock()
+        # Size 1 up front, so the input/output details are known and a bad file fails at load time
+        _, self._input, self._output, _ = self._interpreter(1)
+
+    def _interpreter(self, size):
+        with self._lock:
+            slot = self._interpreters.get(size)
+            if slot is None:
+                interpreter = _interpreter_class()(model_path=self.path, num_threads=self.num_threads)
+                input_details = interpreter.get_input_details()[0]
+                shape = list(input_details['shape'])
+                shape[0] = size
+                interpreter.resize_tensor_input(input_details['index'], shape)
+                interpreter.allocate_tensors()
+                slot = (interpreter, input_details, interpreter.get_output_details()[0], threading.Lock())
+                self._interpreters[size] = slot
+            return slot
+
+    def _quantize(self, batch):
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return batch.astype(np.float32, copy=False)
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, output):
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict_on_batch(self, batch):
+        batch = self._quantize(np.asarray(batch))
+        count = batch.shape[0]
+        size = 1 << max(0, count - 1).bit_length()
+        if size != count:
+            padding = np.zeros((size - count,) + batch.shape[1:], dtype=batch.dtype)
+            batch = np.concatenate([batch, padding])
+        interpreter, input_details, output_details, lock = self._interpreter(size)
+        with lock:
+            interpreter.set_tensor(input_details['index'], batch)
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_details['index'])[:count].copy()
+        return self._dequantize(output)
+
+
+def load_backend(name, keras_path, tflite_path):
+    """Load the CNN behind backend ``name`` (see ``BACKENDS``)."""
+    if name == 'keras':
+        return load_keras(keras_path)
+    if name == 'tflite':
+        if not os.path.exists(tflite_path):
+            raise FileNotFoundError(f'{tflite_path} not found; create it with `python inference.py convert`')
+        return TFLiteBackend(tflite_path, num_threads=config.TF_INTRA_OP_THREADS)
+    raise ValueError(f'Unknown CNN_BACKEND {name!r}, expected one of {BACKENDS}')
+
+
+def load_images(directory, limit):
+    """Model inputs for up to ``limit`` scans below ``directory``, prepared as /api/analyze does."""
+    from bulk_mri import _load, find_images
+    inputs = []
+    for source in find_images(directory)[:limit]:
+        model_input, _ = _load(source, segment=False, threshold=0.6)
+        if model_input is not None and model_input.ndim == 3:
+            inputs.append(model_input)
+    if not inputs:
+        raise ValueError(f'No usable RGB scans found in {directory}')
+    return np.stack(inputs).astype(np.float32)
+
+
+def synthetic_inputs(count, seed=0):
+    """Random smooth RGB inputs, for when no real scans are at hand. Real scans give a far better check."""
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    inputs = []
+    for _ in range(count):
+        small = rng.uniform(0, 255, (14, 14)).astype(np.uint8)
+        image = Image.fromarray(small).resize(INPUT_SIZE, Image.BILINEAR).convert('RGB')
+        inputs.append(np.asarray(image, dtype=np.float32) / 255.0)
+    return np.stack(inputs)
+
+
+def convert(keras_model, quantization='dynamic', calibration=None):
+    """Return TFLite flatbuffer bytes for ``keras_model``.
+
+    ``int8`` quantizes weights and activations and needs ``calibration``
+    inputs; ``dynamic`` quantizes weights only; ``float16`` halves weight size.
+    """
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if calibration is None or not len(calibration):
+            raise ValueError('int8 quantization needs calibration inputs')
+        converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def parity(reference, candidate, inputs, batch_size=8, threshold=0.5):
+    """Compare two backends' probabilities on ``inputs``."""
+    expected, actual = [], []
+    for start in range(0, len(inputs), batch_size):
+        batch = inputs[start:start + batch_size]
+        expected.append(np.asarray(reference.predict_on_batch(batch))[:, 0])
+        actual.append(np.asarray(candidate.predict_on_batch(batch))[:, 0])
+    expected, actual = np.concatenate(expected), np.concatenate(actual)
+    diff = np.abs(expected - actual)
+    return {
+        'samples': int(len(inputs)),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        # Share of scans where both backends reach the same tumor / no-tumor decision
+        'agreement': float(np.mean((expected > threshold) == (actual > threshold))),
+    }
+
+
+def _check_inputs(args):
+    if args.check_dir:
+        return load_images(args.check_dir, args.samples)
+    print('No --check-dir given; checking parity on synthetic inputs only', file=sys.stderr)
+    return synthetic_inputs(args.samples)
+
+
+def _report(result, args):
+    print(json.dumps(result))
+    passed = result['max_abs_diff'] <= args.max_abs_diff and result['agreement'] >= args.min_agreement
+    if not passed:
+        print(f"Parity check failed (max_abs_diff <= {args.max_abs_diff}, agreement >= {args.min_agreement})",
+              file=sys.stderr)
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['convert', 'check'])
+    parser.add_argument('--keras', default=os.path.join(config.MODEL_DIR, 'model.h5'))
+    parser.add_argument('--output', default=os.path.join(config.MODEL_DIR, config.CNN_TFLITE_MODEL),
+                        help='.tflite file written by convert and read by check')
+    parser.add_argument('--quantization', choices=QUANTIZATIONS, default='dynamic')
+    parser.add_argument('--calibration-dir', help='scans used to calibrate int8 activations')
+    parser.add_argument('--check-dir', help='scans used for the parity check (default: synthetic inputs)')
+    parser.add_argument('--samples', type=int, default=64, help='scans used for calibration and the check')
+    parser.add_argument('--max-abs-diff', type=float, default=0.05)
+    parser.add_argument('--min-agreement', type=float, default=0.99)
+    args = parser.parse_args(argv)
+
+    keras_model = load_keras(args.keras)
+    inputs = _check_inputs(args)
+
+    if args.command == 'check':
+        sys.exit(0 if _report(parity(keras_model, TFLiteBackend(args.output), inputs), args) else 1)
+
+    calibration = load_images(args.calibration_dir, args.samples) if args.calibration_dir else None
+    if args.quantization == 'int8' and calibration is None:
+        parser.error('--quantization int8 needs --calibration-dir')
+    flatbuffer = convert(keras_model, args.quantization, calibration)
+
+    # Check from a temporary file so a failing model never replaces the served one
+    tmp_path = f'{args.output}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(flatbuffer)
+    result = parity(keras_model, TFLiteBackend(tmp_path), inputs)
+    result.update({'quantization': args.quantization, 'bytes': len(flatbuffer),
+                   'keras_bytes': os.path.getsize(args.keras)})
+    if not _report(result, args):
+        os.remove(tmp_path)
+        sys.exit(1)
+    os.replace(tmp_path, args.output)
+    print(f'Wrote {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
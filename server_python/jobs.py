@@ -0,0 +1,141 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when the job manager already holds its maximum number of unfinished jobs."""
+
+
+class Job:
+    """One asynchronous analysis. Partial results are published as ordered events."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.results = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._events = []
+        self._condition = threading.Condition()
+
+    def publish(self, key, value):
+        with self._condition:
+            self.results[key] = value
+            self._events.append((key, value))
+            self._condition.notify_all()
+
+    def _start(self):
+        with self._condition:
+            self.status = 'running'
+
+    def _finish(self, status, error=None):
+        with self._condition:
+            # finished_at first: JobManager._purge reads it without taking the condition
+            self.finished_at = time.time()
+            self.status = status
+            self.error = error
+            self._events.append((status, error))
+            self._condition.notify_all()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def event_count(self):
+        with self._condition:
+            return len(self._events)
+
+    def events_since(self, index, timeout=None):
+        """Return events after ``index``, waiting up to ``timeout`` seconds for new ones."""
+        with self._condition:
+            if len(self._events) <= index and not self.finished:
+                self._condition.wait(timeout)
+            return list(self._events[index:])
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'results': dict(self.results),
+                'error': self.error,
+            }
+
+
+class JobManager:
+    """Runs jobs on a fixed thread pool and refuses new work beyond ``max_pending``.
+
+    Finished jobs stay available for ``ttl`` seconds so clients can collect
+    their results. Their results hold full images and plots, so at most
+    ``max_finished`` are kept; the oldest go first.
+    """
+
+    def __init__(self, workers=2, max_pending=16, ttl=600, max_finished=64):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis-job')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule ``fn(job, *args, **kwargs)``; ``fn`` reports partial results via ``job.publish``."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull(f'{self.max_pending} analysis jobs are already pending')
+
+        self._purge()
+        job = Job()
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        except RuntimeError:
+            # Raised after shutdown(); drop the job that will never run
+            with self._lock:
+                del self._jobs[job.id]
+            self._slots.release()
+            raise
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job._start()
+        try:
+            fn(job, *args, **kwargs)
+        except Exception as e:
+            job._finish('failed', str(e))
+        else:
+            job._finish('done')
+        finally:
+            self._slots.release()
+            self._purge()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            # finished_at is read once per job: a job can finish while this runs
+            finished = sorted((finished_at, job_id) for job_id, finished_at in
+                              ((job_id, job.finished_at) for job_id, job in self._jobs.items())
+                              if finished_at is not None)
+            excess = max(0, len(finished) - self.max_finished)
+            for i, (finished_at, job_id) in enumerate(finished):
+                if i < excess or finished_at < cutoff:
+                    del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'max_pending': self.max_pending, 'jobs': counts}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,81 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+import config
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event plus any structured fields."""
+
+    def format(self, record):
+        payload = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() folds the traceback into the message; keep it as a separate field
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_root = logging.getLogger('medisense')
+_root.propagate = False
+_root.setLevel(config.LOG_LEVEL.upper() if config.LOG_ENABLED else logging.CRITICAL + 1)
+
+_listener = None
+
+
+def _start_listener(handler, stream):
+    global _listener
+    handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(handler.queue, stream)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+if not _root.handlers:
+    # Request threads only enqueue records; a background thread formats and writes them
+    _stream = logging.StreamHandler(sys.stderr)
+    _stream.setFormatter(JsonFormatter())
+    _handler = _QueueHandler(queue.SimpleQueue())
+    _root.addHandler(_handler)
+    _start_listener(_handler, _stream)
+    atexit.register(_stop_listener)
+    # The writer thread does not survive fork(); gunicorn workers need their own
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: _start_listener(_handler, _stream))
+
+
+def get_logger(name):
+    return _root.getChild(name)
+
+
+def log_event(logger, event, level=logging.INFO, **fields):
+    """Log ``event`` with structured ``fields``; costs one level check when disabled."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
@@ -1,13 +1,60 @@
+import os
 import joblib
-import tensorflow as tf
+import numpy as np
+import config
+from registry import ModelControl, ModelRegistry
+from batch import SEPSIS_KEYS
+from schema import DIABETES, STRESS
+from pipelines import SepsisPipeline
+from inference import load_backend, synthetic_inputs
 
 
-diabetesModel = joblib.load('./PKL/diabetes_model.pkl')
+registry = ModelRegistry()
+# Admin actions go through control so that every worker applies them
+control = ModelControl(registry, config.MODEL_CONTROL_FILE)
 
-stressModel = joblib.load('./PKL/stress_model.pkl')
 
-model = tf.keras.models.load_model('./PKL/model.h5')
+def _artifact(filename):
+    return os.path.join(config.MODEL_DIR, filename)
 
-sepsiModel = joblib.load('./PKL/sepsis.pkl')
 
-sepsisScaler = joblib.load('./PKL/scaler.pkl')
\ No newline at end of file
+def _warm_classifier(n_features):
+    # One prediction on zeros, so the first real request doesn't pay for lazy setup
+    return lambda model: model.predict(np.zeros((1, n_features)))
+
+
+registry.register('diabetes', joblib.load, _artifact('diabetes_model.pkl'), warm=_warm_classifier(len(DIABETES.keys)))
+
+registry.register('stress', joblib.load, _artifact('stress_model.pkl'), warm=_warm_classifier(len(STRESS.keys)))
+
+# Keras or the converted TFLite file, depending on CNN_BACKEND
+_CNN_ARTIFACT = _artifact(config.CNN_TFLITE_MODEL if config.CNN_BACKEND == 'tflite' else 'model.h5')
+registry.register('brain_tumor',
+                  lambda path: load_backend(config.CNN_BACKEND, path, path),
+                  _CNN_ARTIFACT,
+                  warm=lambda cnn: cnn.predict_on_batch(synthetic_inputs(1)))
+
+registry.register('sepsis', joblib.load, _artifact('sepsis.pkl'))
+
+registry.register('sepsis_scaler', joblib.load, _artifact('scaler.pkl'))
+
+registry.register('sepsis_pipeline',
+                  lambda: SepsisPipeline(registry.get('sepsis_scaler'), registry.get('sepsis'), SEPSIS_KEYS),
+                  depends_on=('sepsis', 'sepsis_scaler'),
+                  warm=_warm_classifier(len(SEPSIS_KEYS)))
+
+
+# Old module-level names, now resolved (and loaded) on first access
+_ALIASES = {
+    'diabetesModel': 'diabetes',
+    'stressModel': 'stress',
+    'model': 'brain_tumor',
+    'sepsiModel': 'sepsis',
+    'sepsisScaler': 'sepsis_scaler',
+}
+
+
+def __getattr__(name):
+    if name in _ALIASES:
+        return registry.get(_ALIASES[name])
+    raise AttributeError(f"module 'model' has no attribute '{name}'")
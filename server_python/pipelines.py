@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+
+# The fast path hands plain arrays to estimators that were fitted on DataFrames.
+# Column order is checked once in SepsisPipeline instead of on every call.
+warnings.filterwarnings('ignore', message='X does not have valid feature names', category=UserWarning)
+
+
+def _check_feature_names(estimator, feature_keys, label):
+    names = getattr(estimator, 'feature_names_in_', None)
+    if names is not None and list(names) != list(feature_keys):
+        raise ValueError(f'{label} was fitted on columns {list(names)}, expected {list(feature_keys)}')
+
+
+class SepsisPipeline:
+    """Sepsis scaler + classifier working on contiguous float64 arrays.
+
+    The scaler's ``mean_``/``scale_`` are applied in place with the same
+    subtract-then-divide steps ``StandardScaler.transform`` uses, so
+    predictions match the DataFrame path bit for bit without building any
+    DataFrames per request.
+    """
+
+    def __init__(self, scaler, model, feature_keys):
+        _check_feature_names(scaler, feature_keys, 'Sepsis scaler')
+        _check_feature_names(model, feature_keys, 'Sepsis model')
+
+        self.scaler = scaler
+        self.model = model
+        self.feature_keys = list(feature_keys)
+
+        # Only a StandardScaler reduces to an affine transform we can replay
+        self.affine = hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_')
+        if self.affine:
+            self.mean = np.ascontiguousarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None
+            self.scale = np.ascontiguousarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None
+
+    def transform(self, features):
+        """Scale an (n, len(feature_keys)) array; the input is never modified."""
+        X = np.array(features, dtype=np.float64, order='C', copy=True, ndmin=2)
+        if X.shape[1] != len(self.feature_keys):
+            raise ValueError(f'Expected {len(self.feature_keys)} sepsis features, got {X.shape[1]}')
+
+        if not self.affine:
+            return self.scaler.transform(X)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+    def predict(self, features):
+        return self.model.predict(self.transform(features))
@@ -0,0 +1,86 @@
+import math
+import threading
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+
+# Per-thread scratch space, grown to the largest image the thread has seen
+_scratch = threading.local()
+
+
+def _scratch_buffer(shape, dtype=np.float32):
+    size = math.prod(shape)
+    buffer = getattr(_scratch, 'buffer', None)
+    if buffer is None or buffer.size < size or buffer.dtype != dtype:
+        buffer = np.empty(size, dtype=dtype)
+        _scratch.buffer = buffer
+    return buffer[:size].reshape(shape)
+
+
+def downsample(image, max_side):
+    """Box-downsample a PIL image by an integer factor so neither side exceeds ``max_side``."""
+    factor = math.ceil(max(image.size) / max_side) if max_side else 1
+    return image.reduce(factor) if factor > 1 else image
+
+
+def preprocess_image(image, sigma=1.5, percentiles=(2, 98), max_side=None):
+    """Grayscale, blur, clip to a percentile window and scale to [0, 1] as float32.
+
+    ``image`` is a PIL image or a 2D array. The blur reads the raw pixels and
+    writes float32 straight into the result, which is then clipped and
+    normalised in place using one global min/max. The percentile search runs
+    on a reusable per-thread scratch copy.
+    """
+    if isinstance(image, Image.Image):
+        if max_side:
+            image = downsample(image, max_side)
+        if image.mode != 'L':
+            image = image.convert('L')
+    pixels = np.asarray(image)
+
+    result = np.empty(pixels.shape, dtype=np.float32)
+    ndimage.gaussian_filter(pixels, sigma=sigma, output=result)
+
+    # np.percentile partitions its input, so give it the scratch copy
+    scratch = _scratch_buffer(pixels.shape)
+    np.copyto(scratch, result)
+    low, high = np.percentile(scratch, percentiles, overwrite_input=True)
+    np.clip(result, low, high, out=result)
+
+    # After clipping the global min/max are the percentile bounds themselves
+    span = float(high) - float(low)
+    result -= np.float32(low)
+    if span > 0:
+        result *= np.float32(1.0 / span)
+    return result
+
+
+def extract_tumor(img_array, threshold=0.6):
+    """Extract tumor regions from the image."""
+    tumor_mask = img_array > threshold
+    # One allocation: pixels outside the mask are multiplied by False (0)
+    tumor_array = np.multiply(img_array, tumor_mask, dtype=img_array.dtype)
+    return tumor_array, tumor_mask
+
+
+def block_mean(array, max_side):
+    """Area-average a 2D array so neither side exceeds ``max_side``.
+
+    Returns ``(reduced, row_centers, col_centers)``; the centers are the
+    middle of each block in the original pixel coordinates. A ragged last
+    block is averaged over the pixels it actually covers.
+    """
+    height, width = array.shape
+    factor = math.ceil(max(height, width) / max_side) if max_side else 1
+    rows = np.arange(0, height, factor)
+    cols = np.arange(0, width, factor)
+    row_ends = np.minimum(rows + factor, height)
+    col_ends = np.minimum(cols + factor, width)
+
+    if factor > 1:
+        sums = np.add.reduceat(np.add.reduceat(array, rows, axis=0, dtype=np.float64), cols, axis=1)
+        reduced = sums / np.outer(row_ends - rows, col_ends - cols)
+    else:
+        reduced = array
+    return reduced, (rows + row_ends - 1) / 2.0, (cols + col_ends - 1) / 2.0
@@ -0,0 +1,560 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from log import get_logger, log_event
+from metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows, where only the single-process development server runs
+    fcntl = None
+
+logger = get_logger('registry')
+
+PREDICT_SECONDS = REGISTRY.histogram('medisense_model_predict_seconds', 'Model call latency per loaded version.',
+                                     ('model', 'version'))
+
+
+def _file_fingerprint(path):
+    """``path:mtime_ns:size`` of an artifact file, or None when there is no file to stat."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return f'{path}:{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """Process-wide home for model artifacts.
+
+    Each artifact is registered with a loader and loaded at most once, either on
+    the first ``get`` or through ``warm_up``. Every blueprint asks the registry
+    for the instance, so there is one copy of each model per process.
+
+    Reloads build and warm the new version while the current one keeps
+    serving, then swap it in with a single assignment; requests already
+    holding the old instance finish with it. A candidate version can answer a
+    percentage of ``get_versioned`` calls next to the current one until it is
+    promoted or dropped. Every version number is used once per model.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._dependents = {}
+        self._entries = {}
+        # name -> (entry, percent)
+        self._candidates = {}
+        self._last_version = {}
+        # Loads are serialised so the RSS delta recorded for a model is its own
+        self._load_lock = threading.RLock()
+        self._reload_listeners = []
+        self._tasks = {}
+        # (name, version) -> [calls, seconds]
+        self._latency = {}
+        self._latency_lock = threading.Lock()
+        # Loaders of a candidate's dependents see the candidate through get()
+        self._building = threading.local()
+
+    def register(self, name, loader, path=None, depends_on=(), warm=None):
+        """Register ``loader``, called as ``loader(path)`` when ``path`` is given and ``loader()`` otherwise.
+
+        ``warm(instance)`` runs on every new version before it serves, so a
+        version that cannot predict never replaces a working one. Models listed
+        in ``depends_on`` trigger a rebuild when reloaded.
+        """
+        self._loaders[name] = (loader, path, warm)
+        for dependency in depends_on:
+            self._dependents.setdefault(dependency, []).append(name)
+
+    def names(self):
+        return list(self._loaders)
+
+    def path(self, name):
+        return self._loaders[name][1]
+
+    def set_path(self, name, path):
+        """Read ``name`` from ``path`` from the next load on."""
+        loader, _, warm = self._loaders[name]
+        self._loaders[name] = (loader, path, warm)
+
+    def is_loaded(self, name):
+        return name in self._entries
+
+    def has_candidate(self, name):
+        return name in self._candidates
+
+    def candidate(self, name):
+        """``(path, percent)`` of the candidate for ``name``, or None."""
+        candidate = self._candidates.get(name)
+        return None if candidate is None else (candidate[0]['path'], candidate[1])
+
+    def get(self, name):
+        """The current instance; candidates are only reachable through ``get_versioned``."""
+        overrides = getattr(self._building, 'overrides', None)
+        if overrides and name in overrides:
+            return overrides[name]['instance']
+        return self._entry(name)['instance']
+
+    def get_versioned(self, name):
+        """Return ``(instance, version)`` read from the same entry; a candidate answers its share of calls."""
+        candidate = self._candidates.get(name)
+        if candidate is not None and random.random() * 100 < candidate[1]:
+            entry = candidate[0]
+        else:
+            entry = self._entry(name)
+        return entry['instance'], entry['version']
+
+    def _entry(self, name):
+        entry = self._entries.get(name)
+        return entry if entry is not None else self._load(name)
+
+    @contextmanager
+    def timed(self, name, version):
+        """Record the latency of one call to ``version`` of ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._latency_lock:
+                totals = self._latency.setdefault((name, version), [0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+            PREDICT_SECONDS.observe(elapsed, model=name, version=version)
+
+    def reload(self, name, path=None):
+        """Load the artifact again from disk (from ``path`` from now on, if given) and swap it in once it is warm."""
+        entry = self._load(name, force=True, path=path)
+        for dependent in self._dependents.get(name, []):
+            if self.is_loaded(dependent):
+                self.reload(dependent)
+        self._notify(name)
+        return entry['version']
+
+    def load_candidate(self, name, path, percent):
+        """Load ``path`` as a candidate version of ``name`` for ``percent`` % of ``get_versioned`` calls.
+
+        Dependents (the sepsis pipeline for ``sepsis``) get a candidate of
+        their own built on it, with the same share. The current versions are
+        loaded first, so every dependent takes part and the candidate's
+        version number comes after theirs. Returns the version.
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError('percent must be between 0 and 100')
+        if name not in self._loaders:
+            raise KeyError(f'Unknown model: {name}')
+
+        with self._load_lock:
+            self._entry(name)
+            for dependent in self._all_dependents(name):
+                self._entry(dependent)
+            built = {name: self._build(name, path)}
+            self._building.overrides = built
+            try:
+                for dependent in self._loaded_dependents(name):
+                    built[dependent] = self._build(dependent, self.path(dependent))
+            finally:
+                self._building.overrides = None
+            for built_name, entry in built.items():
+                self._candidates[built_name] = (entry, percent)
+        log_event(logger, 'candidate loaded', model=name, version=built[name]['version'], path=path, percent=percent)
+        return built[name]['version']
+
+    def set_candidate_percent(self, name, percent):
+        if not 0 <= percent <= 100:
+            raise ValueError('percent must be between 0 and 100')
+        with self._load_lock:
+            if name not in self._candidates:
+                raise KeyError(f'No candidate for {name}')
+            for candidate_name in [name] + self._loaded_dependents(name):
+                if candidate_name in self._candidates:
+                    self._candidates[candidate_name] = (self._candidates[candidate_name][0], percent)
+
+    def drop_candidate(self, name):
+        with self._load_lock:
+            if name not in self._candidates:
+                raise KeyError(f'No candidate for {name}')
+            for candidate_name in [name] + self._loaded_dependents(name):
+                self._candidates.pop(candidate_name, None)
+        log_event(logger, 'candidate dropped', model=name)
+
+    def promote(self, name):
+        """Make the candidate the current version; its file becomes the one reloads read."""
+        with self._load_lock:
+            if name not in self._candidates:
+                raise KeyError(f'No candidate for {name}')
+            for candidate_name in [name] + self._loaded_dependents(name):
+                candidate = self._candidates.pop(candidate_name, None)
+                if candidate is None:
+                    continue
+                entry = candidate[0]
+                self._entries[candidate_name] = entry
+                if entry['path'] is not None:
+                    self.set_path(candidate_name, entry['path'])
+        self._notify(name)
+        log_event(logger, 'candidate promoted', model=name, version=self._entries[name]['version'])
+        return self._entries[name]['version']
+
+    def in_background(self, name, action, fn, *args):
+        """Run ``fn(*args)`` on a thread; its progress shows as ``task`` in ``stats()``."""
+        task = {'action': action, 'status': 'running', 'started_at': time.time()}
+        self._tasks[name] = task
+
+        def run():
+            try:
+                task['version'] = fn(*args)
+                task['status'] = 'done'
+            except Exception as e:
+                task.update(status='failed', error=str(e))
+                log_event(logger, f'{action} failed', logging.ERROR, model=name, error=str(e))
+
+        thread = threading.Thread(target=run, name=f'model-{action}-{name}', daemon=True)
+        thread.start()
+        return thread
+
+    def fingerprint(self, name):
+        """Identify a model's artifact as ``path:mtime_ns:size`` without loading it.
+
+        A loaded model reports the file it was loaded from; otherwise the file
+        that would be loaded now. Unlike ``version``, which counts reloads in
+        this process, the fingerprint agrees between processes, so it can key
+        caches shared between workers.
+        """
+        if name not in self._loaders:
+            raise KeyError(f'Unknown model: {name}')
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry['fingerprint']
+        # Models without a file fall back to the version their first load will get
+        return _file_fingerprint(self.path(name)) or f'{name}:v1'
+
+    def add_reload_listener(self, callback):
+        """Call ``callback(name)`` after a model has been reloaded or a candidate promoted."""
+        self._reload_listeners.append(callback)
+
+    def _notify(self, name):
+        for listener in list(self._reload_listeners):
+            listener(name)
+
+    def _loaded_dependents(self, name):
+        """Loaded models built on ``name``, directly or indirectly."""
+        found = []
+        for dependent in self._dependents.get(name, []):
+            if self.is_loaded(dependent):
+                found.append(dependent)
+                found.extend(self._loaded_dependents(dependent))
+        return found
+
+    def _all_dependents(self, name):
+        """Registered models built on ``name``, directly or indirectly, loaded or not."""
+        found = []
+        for dependent in self._dependents.get(name, []):
+            found.append(dependent)
+            found.extend(self._all_dependents(dependent))
+        return found
+
+    def _build(self, name, path):
+        """Load and warm a new version of ``name`` from ``path`` without installing it."""
+        loader, _, warm = self._loaders[name]
+        with self._load_lock:
+            version = self._last_version.get(name, 0) + 1
+            self._last_version[name] = version
+            fingerprint = _file_fingerprint(path)
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            instance = loader(path) if path is not None else loader()
+            load_seconds = time.perf_counter() - started
+            if warm is not None:
+                warm(instance)
+            warm_seconds = time.perf_counter() - started - load_seconds
+            rss_after = _rss_bytes()
+
+        entry = {
+            'instance': instance,
+            'path': path,
+            'load_seconds': load_seconds,
+            'warm_seconds': warm_seconds,
+            'memory_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            'loaded_at': time.time(),
+            'version': version,
+            'fingerprint': fingerprint or f'{name}:v{version}',
+        }
+        log_event(logger, 'model loaded', model=name, version=version, load_seconds=round(load_seconds, 3),
+                  warm_seconds=round(warm_seconds, 3), memory_bytes=entry['memory_bytes'])
+        return entry
+
+    def _load(self, name, force=False, path=None):
+        if name not in self._loaders:
+            raise KeyError(f'Unknown model: {name}')
+
+        with self._load_lock:
+            # Another thread may have finished the load while we waited
+            previous = self._entries.get(name)
+            if previous is not None and not force:
+                return previous
+            entry = self._build(name, self.path(name) if path is None else path)
+            # One assignment: readers see the old entry or the new one, never a mix
+            self._entries[name] = entry
+            if path is not None:
+                self.set_path(name, path)
+            return entry
+
+    def warm_up(self, names=None):
+        """Load the given models (all registered ones by default) ahead of traffic."""
+        for name in (self.names() if names is None else names):
+            self.get(name)
+
+    def _describe(self, entry):
+        return {
+            'path': entry['path'],
+            'load_seconds': round(entry['load_seconds'], 4),
+            'warm_seconds': round(entry['warm_seconds'], 4),
+            'memory_bytes': entry['memory_bytes'],
+            'loaded_at': entry['loaded_at'],
+            'version': entry['version'],
+        }
+
+    def stats(self):
+        with self._latency_lock:
+            latency = {key: list(totals) for key, totals in self._latency.items()}
+        stats = {}
+        for name in self._loaders:
+            entry = self._entries.get(name)
+            if entry is None:
+                stats[name] = {'loaded': False, 'path': self.path(name)}
+            else:
+                stats[name] = {'loaded': True, **self._describe(entry)}
+            candidate = self._candidates.get(name)
+            if candidate is not None:
+                stats[name]['candidate'] = {**self._describe(candidate[0]), 'percent': candidate[1]}
+            if name in self._tasks:
+                stats[name]['task'] = dict(self._tasks[name])
+            versions = {str(version): {'calls': calls, 'mean_ms': round(seconds / calls * 1000.0, 3)}
+                        for (model, version), (calls, seconds) in sorted(latency.items()) if model == name}
+            if versions:
+                stats[name]['latency'] = versions
+        return stats
+
+
+class ModelControl:
+    """Reloads, candidates and promotions shared between processes through one JSON file.
+
+    Every gunicorn worker has its own registry. An action taken through this
+    class is applied to the local registry, then recorded in ``path``: per
+    model, the file it reads, its candidate and share, and counters of
+    explicit reloads and candidate loads. ``sync`` brings another process's
+    registry in line with the file; ``ModelWatcher`` calls it on every poll.
+    With no ``path`` nothing is shared.
+    """
+
+    def __init__(self, registry, path):
+        self.registry = registry
+        self.path = path or None
+        # name -> {'reloads': n, 'loads': n} already applied in this process
+        self._seen = {}
+        # name -> recorded state that failed to apply; retried once it changes
+        self._failed = {}
+        # Held across an action and its record, so sync never sees one without the other
+        self._lock = threading.RLock()
+
+    def reload(self, name):
+        return self._run(name, self.registry.reload, counter='reloads')
+
+    def load_candidate(self, name, path, percent):
+        return self._run(name, self.registry.load_candidate, path, percent, counter='loads')
+
+    def set_candidate_percent(self, name, percent):
+        return self._run(name, self.registry.set_candidate_percent, percent)
+
+    def drop_candidate(self, name):
+        return self._run(name, self.registry.drop_candidate)
+
+    def promote(self, name):
+        return self._run(name, self.registry.promote)
+
+    def reset(self):
+        """Forget every recorded action; called once when the server starts."""
+        with self._lock:
+            self._seen.clear()
+            self._failed.clear()
+            if self.path:
+                with self._file_lock():
+                    try:
+                        os.remove(self.path)
+                    except FileNotFoundError:
+                        pass
+
+    def sync(self):
+        """Apply actions recorded by other processes; returns the names changed."""
+        if not self.path:
+            return []
+        changed = []
+        with self._lock:
+            try:
+                models = self._read()
+            except (OSError, ValueError) as e:
+                log_event(logger, 'model control unreadable', logging.ERROR, path=self.path, error=str(e))
+                return []
+            for name, state in models.items():
+                if name not in self.registry.names() or state == self._failed.get(name):
+                    continue
+                try:
+                    if self._apply(name, state):
+                        changed.append(name)
+                    self._failed.pop(name, None)
+                except Exception as e:
+                    self._failed[name] = state
+                    log_event(logger, 'model control failed', logging.ERROR, model=name, error=str(e))
+        return changed
+
+    def _run(self, name, action, *args, counter=None):
+        with self._lock:
+            result = action(name, *args)
+            if self.path:
+                self._record(name, counter)
+        return result
+
+    def _apply(self, name, state):
+        registry = self.registry
+        seen = self._seen.setdefault(name, {'reloads': 0, 'loads': 0})
+        changed = False
+        wanted = state.get('candidate')
+
+        path = state.get('path')
+        if path is not None and path != registry.path(name):
+            candidate = registry.candidate(name)
+            if wanted is None and candidate is not None and candidate[0] == path:
+                registry.promote(name)
+            elif registry.is_loaded(name):
+                registry.reload(name, path)
+            else:
+                registry.set_path(name, path)
+            seen['reloads'] = state.get('reloads', 0)
+            changed = True
+        if state.get('reloads', 0) != seen['reloads']:
+            seen['reloads'] = state.get('reloads', 0)
+            # A model not loaded yet reads the file when it first loads
+            if registry.is_loaded(name):
+                registry.reload(name)
+                changed = True
+
+        candidate = registry.candidate(name)
+        if wanted is None:
+            if candidate is not None:
+                registry.drop_candidate(name)
+                changed = True
+        elif candidate is None or candidate[0] != wanted['path'] or state.get('loads', 0) != seen['loads']:
+            registry.load_candidate(name, wanted['path'], wanted['percent'])
+            seen['loads'] = state.get('loads', 0)
+            changed = True
+        elif candidate[1] != wanted['percent']:
+            registry.set_candidate_percent(name, wanted['percent'])
+            changed = True
+        return changed
+
+    def _record(self, name, counter):
+        """Write ``name``'s path and candidate as this process has them, bumping ``counter``."""
+        candidate = self.registry.candidate(name)
+        with self._file_lock():
+            models = self._read()
+            state = models.setdefault(name, {})
+            state['path'] = self.registry.path(name)
+            state['candidate'] = None if candidate is None else {'path': candidate[0], 'percent': candidate[1]}
+            if counter:
+                state[counter] = state.get(counter, 0) + 1
+                self._seen.setdefault(name, {'reloads': 0, 'loads': 0})[counter] = state[counter]
+
+            # Write then rename, so readers in other workers never see a partial file
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'models': models}, f)
+            os.replace(tmp_path, self.path)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)['models']
+        except FileNotFoundError:
+            return {}
+
+    @contextmanager
+    def _file_lock(self):
+        # Serialises read-modify-write between workers; closing the file releases the lock
+        with open(f'{self.path}.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+
+class ModelWatcher:
+    """Reload loaded models whose artifact file changes on disk.
+
+    Polls every ``interval`` seconds. A change is acted on once the file has
+    looked the same for two polls in a row, so a file that is still being
+    copied in is never loaded half-written. A file that failed to load is
+    not retried until it changes again. With a ``control``, every poll also
+    applies the actions other processes recorded there.
+    """
+
+    def __init__(self, registry, interval, control=None):
+        self.registry = registry
+        self.interval = interval
+        self.control = control
+        self._pending = {}
+        self._failed = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        """Check every loaded model once; returns the names reloaded."""
+        reloaded = self.control.sync() if self.control is not None else []
+        for name in self.registry.names():
+            path = self.registry.path(name)
+            if path is None or not self.registry.is_loaded(name):
+                continue
+            current = _file_fingerprint(path)
+            if current is None or current == self.registry.fingerprint(name) or current == self._failed.get(name):
+                self._pending.pop(name, None)
+                continue
+            if self._pending.get(name) != current:
+                self._pending[name] = current
+                continue
+
+            del self._pending[name]
+            log_event(logger, 'model file changed', model=name, path=path)
+            try:
+                self.registry.reload(name)
+                self._failed.pop(name, None)
+                reloaded.append(name)
+            except Exception as e:
+                self._failed[name] = current
+                log_event(logger, 'reload failed', logging.ERROR, model=name, error=str(e))
+        return reloaded
@@ -0,0 +1,116 @@
+import base64
+import io
+import os
+import uuid
+from datetime import datetime
+
+import jinja2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import config
+from encoding import encode_image, default_options
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Compiled once per process; rendering a compiled template is thread-safe
+_environment = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+    autoescape=jinja2.select_autoescape(['html']),
+)
+REPORT_TEMPLATE = _environment.get_template('report.html')
+
+TITLE_HEIGHT = 40
+PANEL_GAP = 20
+
+
+def _load_font(size=20):
+    try:
+        return ImageFont.truetype('DejaVuSans.ttf', size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+TITLE_FONT = _load_font()
+
+
+def _to_display(img):
+    """Grayscale uint8 stretched to its own min/max, as imshow(cmap='gray') shows it."""
+    pixels = np.asarray(img.convert('L'), dtype=np.float32)
+    low, high = float(pixels.min()), float(pixels.max())
+    if high > low:
+        pixels = (pixels - low) * (255.0 / (high - low))
+    else:
+        pixels = np.zeros_like(pixels)
+    return Image.fromarray(pixels.astype(np.uint8), mode='L')
+
+
+def report_image_options():
+    # Never thumbnailed; the report is the copy that gets archived. Its inputs are full size only when
+    # they are: /analyze keeps full-size pixels for reports built from artifact ids, while images
+    # posted inline are used as sent.
+    return default_options()._replace(format=config.REPORT_IMAGE_FORMAT, thumbnail=0)
+
+
+def compose_comparison(original_img, tumor_img, titles=('Original Image', 'Extracted Tumor'), options=None):
+    """Place two scans side by side under their titles; returns ``(bytes, content type)``."""
+    panels = [_to_display(original_img), _to_display(tumor_img)]
+    if panels[1].size != panels[0].size:
+        panels[1] = panels[1].resize(panels[0].size, Image.BILINEAR)
+
+    width, height = panels[0].size
+    canvas = Image.new('L', (2 * width + PANEL_GAP, height + TITLE_HEIGHT), color=255)
+    draw = ImageDraw.Draw(canvas)
+    for i, (panel, title) in enumerate(zip(panels, titles)):
+        left = i * (width + PANEL_GAP)
+        canvas.paste(panel, (left, TITLE_HEIGHT))
+        text_width = draw.textlength(title, font=TITLE_FONT)
+        draw.text((left + (width - text_width) / 2, TITLE_HEIGHT / 4), title, fill=0, font=TITLE_FONT)
+
+    data, content_type, _ = encode_image(canvas, options or report_image_options())
+    return data, content_type
+
+
+def severity_for(probability):
+    """Return (severity, colour) for a tumor probability."""
+    if probability > 0.7:
+        return "High", "#c81e1e"  # Red
+    if probability > 0.4:
+        return "Medium", "#c27803"  # Amber
+    return "Low", "#057a55"  # Green
+
+
+def generate_html_report(patient_info, tumor_info, original_b64, tumor_b64, plot_3d_json):
+    """Generate an HTML report using Jinja2 templating."""
+    # Decode images from base64
+    original_img = Image.open(io.BytesIO(base64.b64decode(original_b64)))
+    tumor_img = Image.open(io.BytesIO(base64.b64decode(tumor_b64)))
+    return render_report(patient_info, tumor_info, original_img, tumor_img, plot_3d_json)
+
+
+def render_report(patient_info, tumor_info, original_img, tumor_img, plot_3d_json):
+    """Render the report from already decoded PIL images."""
+    # Create comparison image
+    comparison, img_content_type = compose_comparison(original_img, tumor_img)
+    img_base64 = base64.b64encode(comparison).decode()
+
+    # Current date and report ID
+    current_date = datetime.now().strftime("%B %d, %Y")
+    report_id = f"MRI-{str(uuid.uuid4())[:8].upper()}"
+
+    # Format probability for display
+    probability_percentage = f"{(tumor_info['probability'] * 100):.1f}%"
+    severity, severity_color = severity_for(tumor_info['probability'])
+
+    return REPORT_TEMPLATE.render(
+        patient_info=patient_info,
+        tumor_info=tumor_info,
+        img_base64=img_base64,
+        img_content_type=img_content_type,
+        plot_json=plot_3d_json,
+        current_date=current_date,
+        probability_percentage=probability_percentage,
+        severity=severity,
+        severity_color=severity_color,
+        report_id=report_id
+    )
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class InferenceScheduler:
+    """Gathers concurrent single-sample predictions into batched forward passes.
+
+    Callers submit one preprocessed sample at a time. A background thread takes
+    the first waiting sample, keeps collecting until either ``max_batch_size``
+    samples are queued or ``max_wait_ms`` has passed since that first sample
+    arrived, then runs ``predict_fn`` once on the stacked batch and hands every
+    caller its own row of the output. ``on_batch(entry)``, if given, receives
+    the statistics of every finished batch.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=5.0, history=256, on_batch=None):
+        self.predict_fn = predict_fn
+        self.on_batch = on_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._recent = deque(maxlen=history)
+        self._totals = {'batches': 0, 'samples': 0, 'errors': 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Finish the batches already queued, then stop the worker thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, sample):
+        """Queue one sample and return a Future resolving to its prediction."""
+        self.start()
+        future = Future()
+        self._queue.put((np.asarray(sample), future, time.perf_counter()))
+        return future
+
+    def predict(self, sample, timeout=None):
+        return self.submit(sample).result(timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the stop marker so the run loop sees it after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            started = time.perf_counter()
+
+            # Samples of different shapes (e.g. grayscale vs RGB uploads) cannot share a tensor
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[0].shape, []).append(item)
+
+            errors = 0
+            for items in groups.values():
+                try:
+                    outputs = self.predict_fn(np.stack([sample for sample, _, _ in items]))
+                except Exception as e:
+                    errors += len(items)
+                    for _, future, _ in items:
+                        future.set_exception(e)
+                    continue
+                for (_, future, _), output in zip(items, outputs):
+                    future.set_result(output)
+
+            finished = time.perf_counter()
+            self._record({
+                'batch_size': len(batch),
+                'forward_passes': len(groups),
+                'queue_depth': self._queue.qsize(),
+                'wait_ms': (started - batch[0][2]) * 1000.0,
+                'inference_ms': (finished - started) * 1000.0,
+                'errors': errors,
+            })
+
+    def _record(self, entry):
+        with self._lock:
+            self._recent.append(entry)
+            self._totals['batches'] += 1
+            self._totals['samples'] += entry['batch_size']
+            self._totals['errors'] += entry['errors']
+        if self.on_batch is not None:
+            self.on_batch(entry)
+
+    def stats(self):
+        """Totals since start plus averages over the most recent batches."""
+        with self._lock:
+            recent = list(self._recent)
+            stats = dict(self._totals)
+
+        stats.update({
+            'limits': {'max_batch_size': self.max_batch_size, 'max_wait_ms': self.max_wait * 1000.0},
+            'queue_depth': self._queue.qsize(),
+            'recent_batches': len(recent),
+        })
+        if recent:
+            for key in ('batch_size', 'queue_depth', 'wait_ms', 'inference_ms'):
+                values = [entry[key] for entry in recent]
+                stats[f'avg_{key}'] = sum(values) / len(values)
+                stats[f'max_{key}'] = max(values)
+        return stats
@@ -0,0 +1,186 @@
+"""Declarative feature schemas for the tabular models.
+
+Each model declares its columns once, in model input order, with dtype and
+accepted range. ``Schema`` compiles the declaration into NumPy bounds, so a
+single request or a whole batch becomes a typed feature matrix with
+vectorised checks. Field-level error messages come back for bad input.
+"""
+import operator
+import re
+from collections import namedtuple
+
+import numpy as np
+
+Field = namedtuple('Field', ['name', 'dtype', 'min', 'max'])
+
+
+class ValidationError(ValueError):
+    """Raised for a request that does not match its schema; ``errors`` maps field -> message."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f'{field}: {message}' for field, message in errors.items()))
+        self.errors = errors
+
+
+def _column_to_float(values):
+    """Convert one column to a 1-D float64 array, mapping anything unparseable or nested to NaN."""
+    try:
+        # Fast path: numbers, numeric strings and None (-> NaN) in one C-level pass
+        out = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = None
+    # Equal-length nested lists convert without error but come out 2-D
+    if out is not None and out.ndim == 1:
+        return out
+    out = np.empty(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        try:
+            out[i] = float(value)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+class Schema:
+    """An ordered set of fields compiled to bound arrays.
+
+    ``int`` fields are truncated towards zero like ``int()``; bounds are
+    inclusive and checked after truncation.
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = tuple(fields)
+        self.keys = [field.name for field in self.fields]
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self._low = np.array([field.min for field in self.fields], dtype=np.float64)
+        self._high = np.array([field.max for field in self.fields], dtype=np.float64)
+        self._integer = np.array([field.dtype == 'int' for field in self.fields])
+        self._any_integer = bool(self._integer.any())
+
+    def _finish(self, matrix):
+        """Truncate int columns in place; return (missing or non-numeric, out of range) masks."""
+        invalid = ~np.isfinite(matrix)
+        if self._any_integer:
+            matrix[:, self._integer] = np.trunc(matrix[:, self._integer])
+        with np.errstate(invalid='ignore'):
+            out_of_range = ((matrix < self._low) | (matrix > self._high)) & ~invalid
+        return invalid, out_of_range
+
+    def validate(self, record):
+        """Turn one JSON object into a (1, n_features) float64 matrix or raise ValidationError."""
+        if not isinstance(record, dict):
+            raise ValidationError({'body': 'expected a JSON object'})
+        raw = [record.get(key) for key in self.keys]
+        matrix = _column_to_float(raw).reshape(1, -1)
+        invalid, out_of_range = self._finish(matrix)
+        if invalid.any() or out_of_range.any():
+            errors = {}
+            for j in np.flatnonzero(invalid[0] | out_of_range[0]):
+                field = self.fields[j]
+                if raw[j] is None:
+                    errors[field.name] = 'is required'
+                elif invalid[0, j]:
+                    errors[field.name] = f'must be a number, got {raw[j]!r}'
+                else:
+                    errors[field.name] = f'must be between {field.min:g} and {field.max:g}'
+            raise ValidationError(errors)
+        return matrix
+
+    def validate_columns(self, n_rows, columns):
+        """Build the (n_rows, n_features) matrix for columnar input plus one error message (or None) per row."""
+        matrix = np.empty((n_rows, len(self.keys)), dtype=np.float64)
+        for j, key in enumerate(self.keys):
+            matrix[:, j] = _column_to_float(columns[key])
+        invalid, out_of_range = self._finish(matrix)
+
+        errors = [None] * n_rows
+        for i in np.flatnonzero(invalid.any(axis=1) | out_of_range.any(axis=1)):
+            parts = []
+            missing = [self.keys[j] for j in np.flatnonzero(invalid[i])]
+            if missing:
+                parts.append(f"Missing or invalid value for {', '.join(missing)}")
+            for j in np.flatnonzero(out_of_range[i]):
+                field = self.fields[j]
+                parts.append(f'{field.name} must be between {field.min:g} and {field.max:g}')
+            errors[i] = '; '.join(parts)
+        return matrix, errors
+
+
+_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+_RULE = re.compile(r'^\s*(\w+)\s*(<=|>=|<|>)\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+class Prefilter:
+    """Rule-based shortcut evaluated on the whole matrix before the model.
+
+    ``rules`` is a comma separated list such as ``"HR>120,HR<90,Platelets<150"``.
+    Rows matching any rule get ``outcome`` without a model call. Values are
+    compared truncated to integers, as the original handler's ``int()`` did.
+    """
+
+    def __init__(self, schema, rules, outcome):
+        self.outcome = outcome
+        self.rules = []
+        for rule in filter(None, (part.strip() for part in rules.split(','))):
+            match = _RULE.match(rule)
+            if match is None or match.group(1) not in schema.index:
+                raise ValueError(f'Invalid {schema.name} prefilter rule: {rule!r}')
+            field, op, threshold = match.groups()
+            self.rules.append((schema.index[field], _OPERATORS[op], float(threshold)))
+
+    def matches(self, matrix):
+        """Boolean mask of rows decided by the rules."""
+        flagged = np.zeros(len(matrix), dtype=bool)
+        for column, op, threshold in self.rules:
+            flagged |= op(np.trunc(matrix[:, column]), threshold)
+        return flagged
+
+
+# Bounds are deliberately wide: they reject impossible values and typos, not unusual patients.
+# All diabetes inputs are ints because the original handler always ran them through int().
+DIABETES = Schema('diabetes', [
+    Field('Pregnancies', 'int', 0, 30),
+    Field('Glucose', 'int', 0, 1000),
+    Field('BloodPressure', 'int', 0, 300),
+    Field('SkinThickness', 'int', 0, 200),
+    Field('Insulin', 'int', 0, 2000),
+    Field('BMI', 'int', 0, 150),
+    Field('DiabetesPedigreeFunction', 'int', 0, 10),
+    Field('Age', 'int', 0, 130),
+])
+
+STRESS = Schema('stress', [
+    Field('Education', 'int', 0, 4),
+    Field('Gender', 'int', 0, 3),
+    Field('Engnat', 'int', 0, 2),
+    Field('Age', 'int', 0, 130),
+    Field('Married', 'int', 0, 3),
+    Field('Familysize', 'int', 0, 100),
+    Field('stress_sum', 'int', 0, 42),
+])
+
+SEPSIS = Schema('sepsis', [
+    Field('Hour', 'float', 0, 10000),
+    Field('HR', 'float', 0, 350),
+    Field('O2Sat', 'float', 0, 100),
+    Field('Temp', 'float', 20, 50),
+    Field('MAP', 'float', 0, 400),
+    Field('Resp', 'float', 0, 150),
+    Field('BUN', 'float', 0, 500),
+    Field('Chloride', 'float', 0, 250),
+    Field('Creatinine', 'float', 0, 100),
+    Field('Glucose', 'float', 0, 2000),
+    Field('Hct', 'float', 0, 100),
+    Field('Hgb', 'float', 0, 40),
+    Field('WBC', 'float', 0, 1000),
+    Field('Platelets', 'float', 0, 5000),
+    Field('Age', 'float', 0, 130),
+    Field('HospAdmTime', 'float', -100000, 100000),
+    Field('ICULOS', 'float', 0, 10000),
+    # One-hot unit columns
+    Field('0', 'float', 0, 1),
+    Field('1', 'float', 0, 1),
+])
+
+SCHEMAS = {schema.name: schema for schema in (DIABETES, STRESS, SEPSIS)}
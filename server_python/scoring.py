@@ -0,0 +1,57 @@
+import numpy as np
+
+import config
+from batch import iter_chunks
+from model import registry
+from schema import SCHEMAS, SEPSIS, Prefilter
+
+# Clinical shortcut: rows matching any rule are reported as sepsis without running the model
+SEPSIS_PREFILTER = Prefilter(SEPSIS, config.SEPSIS_PREFILTER, outcome=True)
+
+
+def _predict(name, features):
+    # Each chunk goes to one version; with a candidate loaded, chunks are split between versions
+    model, version = registry.get_versioned(name)
+    with registry.timed(name, version):
+        return model.predict(features)
+
+
+def _predict_diabetes_chunk(features):
+    return [bool(p == 1) for p in _predict('diabetes', features)]
+
+
+def _predict_stress_chunk(features):
+    return [str(p) for p in _predict('stress', features)]
+
+
+def _predict_sepsis_chunk(features):
+    flagged = SEPSIS_PREFILTER.matches(features)
+    results = np.full(len(features), SEPSIS_PREFILTER.outcome, dtype=bool)
+    remaining = np.flatnonzero(~flagged)
+    if len(remaining):
+        prediction = _predict('sepsis_pipeline', features[remaining])
+        results[remaining] = prediction == 1
+    return results.tolist()
+
+
+# name -> chunk predictor; feature order and validation come from schema.SCHEMAS
+BATCH_MODELS = {
+    'diabetes': _predict_diabetes_chunk,
+    'stress': _predict_stress_chunk,
+    'sepsis': _predict_sepsis_chunk,
+}
+
+
+def score_columns(name, n_rows, columns, chunk_size):
+    """Score columnar input with model ``name``.
+
+    Returns one ``{'prediction': ...}`` or ``{'error': ...}`` dict per row.
+    """
+    features, errors = SCHEMAS[name].validate_columns(n_rows, columns)
+    results = [{'error' : error} for error in errors]
+
+    valid = np.array([i for i, error in enumerate(errors) if error is None], dtype=np.intp)
+    for chunk in iter_chunks(valid, chunk_size):
+        for i, prediction in zip(chunk, BATCH_MODELS[name](features[chunk])):
+            results[i] = {'prediction' : prediction}
+    return results
@@ -0,0 +1,97 @@
+"""Process lifecycle for the production entry point: model warm-up, readiness and graceful shutdown.
+
+Under gunicorn (see gunicorn.conf.py) the scikit-learn models are loaded in
+the master before it forks, so every worker shares those pages copy-on-write.
+TensorFlow is not fork-safe, so the CNN is loaded in each worker after the
+fork, on a background thread. The worker can answer /ready while the CNN is
+still loading.
+"""
+import logging
+import threading
+
+import config
+from log import get_logger, log_event
+from model import control, registry
+from registry import ModelWatcher
+
+logger = get_logger('serving')
+
+# Loading these initialises native thread pools that do not survive fork()
+FORK_UNSAFE_MODELS = ('brain_tumor',)
+
+_draining = threading.Event()
+_warm_up_errors = {}
+
+
+def startup_models():
+    """Models that must be loaded before the process reports ready (WARMUP_MODELS, default all)."""
+    names = config.WARMUP_MODELS or ['all']
+    return registry.names() if names == ['all'] else names
+
+
+def warm_up(names):
+    for name in names:
+        try:
+            registry.warm_up([name])
+        except Exception as e:
+            _warm_up_errors[name] = str(e)
+            log_event(logger, 'model warm-up failed', logging.ERROR, model=name, error=str(e))
+
+
+def preload():
+    """Load the fork-safe startup models; called in the gunicorn master before workers fork."""
+    warm_up([name for name in startup_models() if name not in FORK_UNSAFE_MODELS])
+
+
+def warm_up_in_background():
+    """Load the remaining startup models after fork without blocking the worker's accept loop."""
+    pending = [name for name in startup_models() if not registry.is_loaded(name)]
+    thread = threading.Thread(target=warm_up, args=(pending,), name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def start_model_watcher():
+    """Reload models whose files change under MODEL_DIR and apply actions taken in other workers.
+
+    Started per process, after any fork.
+    """
+    return ModelWatcher(registry, config.MODEL_WATCH_INTERVAL, control).start()
+
+
+def reset_model_control():
+    """Discard model actions from an earlier run; they last until the server restarts."""
+    control.reset()
+
+
+def readiness():
+    """Return ``(ready, details)``; ready once every startup model is loaded and no shutdown has begun."""
+    models = {name: registry.is_loaded(name) for name in startup_models()}
+    details = {'models': models, 'draining': _draining.is_set()}
+    if _warm_up_errors:
+        details['errors'] = dict(_warm_up_errors)
+    return all(models.values()) and not _draining.is_set(), details
+
+
+def is_draining():
+    return _draining.is_set()
+
+
+def begin_drain():
+    """Report not-ready from now on, so load balancers stop routing here."""
+    _draining.set()
+
+
+def drain(timeout=None):
+    """Stop taking analysis jobs, let the running ones finish, then stop the CNN scheduler."""
+    timeout = config.SHUTDOWN_TIMEOUT if timeout is None else timeout
+    begin_drain()
+    log_event(logger, 'draining', timeout=timeout)
+
+    from Routers.server import analysis_jobs, inference_scheduler
+    # Executor.shutdown has no timeout of its own
+    waiter = threading.Thread(target=analysis_jobs.shutdown, kwargs={'wait': True}, daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    inference_scheduler.stop(timeout=5)
+    log_event(logger, 'drained', jobs_finished=not waiter.is_alive())
@@ -0,0 +1,32 @@
+import os
+from collections import OrderedDict
+
+from analysis_cache import AnalysisCache, cache_key
+
+PARTS = OrderedDict([('image', (b'\x89PNG' * 10, 'image/png')), ('plot', (b'{"data": []}', 'application/json'))])
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    key = cache_key(b'scan', 'model:1', {'grid': 64})
+    AnalysisCache(directory=str(tmp_path)).put(key, {'probability': 0.5}, PARTS)
+
+    other = AnalysisCache(directory=str(tmp_path))
+    assert other.get(key) == ({'probability': 0.5}, PARTS)
+    assert other.stats()['disk_hits'] == 1
+    assert other.get(key) == ({'probability': 0.5}, PARTS)
+    assert other.stats()['memory_hits'] == 1
+
+
+def test_truncated_file_is_a_miss(tmp_path):
+    key = cache_key(b'scan', 'model:1', {})
+    AnalysisCache(directory=str(tmp_path)).put(key, {}, PARTS)
+    path = os.path.join(str(tmp_path), f'{key}.bin')
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert AnalysisCache(directory=str(tmp_path)).get(key) is None
+
+
+def test_key_changes_with_model_and_params():
+    keys = {cache_key(b'scan', 'model:1', {}), cache_key(b'scan', 'model:2', {}),
+            cache_key(b'scan', 'model:1', {'grid': 32}), cache_key(b'other', 'model:1', {})}
+    assert len(keys) == 4
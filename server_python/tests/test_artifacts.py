@@ -0,0 +1,68 @@
+import os
+import time
+
+from artifacts import ArtifactStore
+
+
+def test_put_and_get_round_trip():
+    store = ArtifactStore(max_bytes=1024)
+    artifact_id = store.put(b'plot', 'application/json')
+    assert store.get(artifact_id) == (b'plot', 'application/json')
+    assert store.get('0' * 32) is None
+    assert store.stats()['hits'] == 1 and store.stats()['misses'] == 1
+
+
+def test_malformed_ids_are_unknown():
+    store = ArtifactStore()
+    for artifact_id in (None, '', '../etc/passwd', 42, ['a'], {'id': 'a'}):
+        assert store.get(artifact_id) is None
+
+
+def test_least_recently_used_is_dropped_without_a_spill_dir():
+    store = ArtifactStore(max_bytes=10)
+    first = store.put(b'12345', 'image/png')
+    second = store.put(b'12345', 'image/png')
+    store.get(first)
+    store.put(b'12345', 'image/png')
+    assert store.get(second) is None
+    assert store.get(first) == (b'12345', 'image/png')
+
+
+def test_evicted_artifacts_spill_to_disk_and_load_back(tmp_path):
+    store = ArtifactStore(max_bytes=10, spill_dir=str(tmp_path))
+    first = store.put(b'123456', 'image/png')
+    second = store.put(b'abcdef', 'application/x-npy')
+    assert store.stats() == {**store.stats(), 'items': 1, 'spilled': 1}
+    assert os.listdir(str(tmp_path)) == [f'{first}.png']
+    assert store.get(first) == (b'123456', 'image/png')
+
+    # Another worker sharing the directory serves it too
+    other = ArtifactStore(max_bytes=10, spill_dir=str(tmp_path))
+    assert other.get(first) == (b'123456', 'image/png')
+    assert other.get(second) is None
+
+
+def test_spill_dir_is_trimmed_oldest_first(tmp_path):
+    store = ArtifactStore(max_bytes=1, spill_dir=str(tmp_path), spill_max_bytes=8)
+    ids = []
+    for i in range(4):
+        ids.append(store.put(bytes([i]) * 4, 'image/png'))
+        # Trimming goes by mtime
+        time.sleep(0.02)
+    spilled = sorted(os.listdir(str(tmp_path)))
+    assert len(spilled) == 2
+    assert store.get(ids[0]) is None
+    assert store.get(ids[3]) == (b'\x03' * 4, 'image/png')
+
+
+def test_report_rejects_artifacts_that_are_not_an_object():
+    from app import app
+    client = app.test_client()
+    for artifacts in (['a', 'b'], 'abc', 7):
+        response = client.post('/api/generate-report', json={'patient_info': {}, 'tumor_info': {}, 'artifacts': artifacts})
+        assert response.status_code == 400
+    assert client.post('/api/generate-report', json=[1]).status_code == 400
+    response = client.post('/api/generate-report', json={'patient_info': {}, 'tumor_info': {},
+                                                         'artifacts': {'processed_image': 5, 'tumor_image': None,
+                                                                       'plot_3d': '0' * 32}})
+    assert response.status_code == 404
@@ -0,0 +1,45 @@
+import cache
+from cache import ResultCache
+from registry import ModelRegistry
+
+
+def test_least_recently_used_entry_is_evicted():
+    results = ResultCache(maxsize=2)
+    results.put('a', 1)
+    results.put('b', 2)
+    assert results.get('a') == (True, 1)
+    results.put('c', 3)
+    assert results.get('b') == (False, None)
+    assert results.get('a') == (True, 1) and results.get('c') == (True, 3)
+    assert results.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    results = ResultCache(maxsize=4, ttl=10)
+    results.put('a', 1)
+    now[0] = 109.9
+    assert results.get('a') == (True, 1)
+    now[0] = 110.0
+    assert results.get('a') == (False, None)
+    assert results.stats()['size'] == 0
+
+
+def test_zero_size_disables_the_cache():
+    results = ResultCache(maxsize=0)
+    results.put('a', 1)
+    assert results.get('a') == (False, None)
+
+
+def test_model_reload_clears_cached_predictions():
+    registry = ModelRegistry()
+    registry.register('diabetes', lambda: object())
+    results = ResultCache(maxsize=4)
+    # As wired in Routers/modelRouter.py
+    registry.add_reload_listener(lambda name: results.clear())
+    registry.get('diabetes')
+    results.put(('diabetes', 1), True)
+
+    registry.reload('diabetes')
+    assert results.get(('diabetes', 1)) == (False, None)
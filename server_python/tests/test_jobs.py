@@ -0,0 +1,40 @@
+import threading
+
+from jobs import JobManager
+
+
+def test_purge_skips_a_job_caught_finishing():
+    manager = JobManager(workers=1, max_pending=4, ttl=600, max_finished=1)
+    release = threading.Event()
+    blocked = manager.submit(lambda job: release.wait(5))
+    done = manager.submit(lambda job: None)
+    # Between the two assignments the old _finish made: finished status, no finished_at yet
+    blocked.status = 'done'
+    manager._purge()
+    assert manager.get(blocked.id) is blocked
+
+    release.set()
+    manager.shutdown()
+    assert blocked.finished_at is not None and done.finished_at is not None
+
+
+def test_finished_jobs_are_capped_oldest_first():
+    manager = JobManager(workers=1, max_pending=8, ttl=600, max_finished=2)
+    jobs = [manager.submit(lambda job, n=n: job.publish('n', n)) for n in range(4)]
+    manager.shutdown()
+    manager._purge()
+    assert [manager.get(job.id) for job in jobs] == [None, None, jobs[2], jobs[3]]
+    assert jobs[3].snapshot()['results'] == {'n': 3}
+
+
+def test_failed_job_reports_its_error_as_the_last_event():
+    manager = JobManager(workers=1)
+
+    def fail(job):
+        job.publish('probability', 0.5)
+        raise ValueError('bad scan')
+
+    job = manager.submit(fail)
+    manager.shutdown()
+    assert job.status == 'failed'
+    assert job.events_since(0) == [('probability', 0.5), ('failed', 'bad scan')]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from batch import SEPSIS_KEYS
+from pipelines import SepsisPipeline
+
+# The pipeline feeds arrays to estimators fitted on DataFrames on purpose
+pytestmark = pytest.mark.filterwarnings('ignore:X does not have valid feature names')
+
+
+def fit(scaler):
+    """A scaler and a small forest fitted on DataFrames, as the PKL artifacts were."""
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame(rng.normal(100, 30, (500, len(SEPSIS_KEYS))), columns=SEPSIS_KEYS)
+    scaler.fit(train)
+    scaled = pd.DataFrame(scaler.transform(train), columns=SEPSIS_KEYS)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaled, scaled['HR'] > scaled['HR'].median())
+    return scaler, model
+
+
+def dataframe_predict(scaler, model, rows):
+    """The original handler's path: DataFrame -> transform -> DataFrame -> predict."""
+    scaled = scaler.transform(pd.DataFrame(rows, columns=SEPSIS_KEYS))
+    return scaled, model.predict(pd.DataFrame(scaled, columns=SEPSIS_KEYS))
+
+
+@pytest.mark.parametrize('scaler', [StandardScaler(), StandardScaler(with_mean=False), MinMaxScaler()])
+@pytest.mark.parametrize('n_rows', [1, 64, 1024])
+def test_pipeline_matches_the_dataframe_path_bit_for_bit(scaler, n_rows):
+    scaler, model = fit(scaler)
+    pipeline = SepsisPipeline(scaler, model, SEPSIS_KEYS)
+    rows = np.random.default_rng(n_rows).normal(100, 30, (n_rows, len(SEPSIS_KEYS)))
+
+    scaled, predictions = dataframe_predict(scaler, model, rows)
+    assert np.array_equal(pipeline.transform(rows), scaled)
+    assert np.array_equal(pipeline.predict(rows), predictions)
+
+
+def test_transform_leaves_the_input_alone():
+    pipeline = SepsisPipeline(*fit(StandardScaler()), SEPSIS_KEYS)
+    rows = np.full((2, len(SEPSIS_KEYS)), 100.0)
+    pipeline.transform(rows)
+    assert (rows == 100.0).all()
+
+
+def test_estimators_fitted_on_other_columns_are_rejected():
+    scaler, model = fit(StandardScaler())
+    with pytest.raises(ValueError, match='Sepsis scaler was fitted on columns'):
+        SepsisPipeline(scaler, model, list(reversed(SEPSIS_KEYS)))
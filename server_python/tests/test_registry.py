@@ -0,0 +1,78 @@
+from registry import ModelControl, ModelRegistry
+
+
+class Model:
+    def __init__(self, path, base=None):
+        self.path = path
+        self.base = base
+
+
+def make_registry(tmp_path):
+    registry = ModelRegistry()
+    registry.register('base', Model, str(tmp_path / 'base.pkl'))
+    registry.register('pipeline', lambda: Model(None, registry.get('base')), depends_on=('base',))
+    return registry
+
+
+def write(tmp_path, name):
+    (tmp_path / name).write_bytes(name.encode())
+    return str(tmp_path / name)
+
+
+def test_candidate_covers_dependents_that_were_not_loaded(tmp_path):
+    write(tmp_path, 'base.pkl')
+    candidate = write(tmp_path, 'candidate.pkl')
+    registry = make_registry(tmp_path)
+
+    assert registry.load_candidate('base', candidate, 50) == 2
+    stats = registry.stats()
+    assert stats['base']['version'] == 1
+    assert stats['base']['candidate']['version'] == 2
+    assert stats['pipeline']['candidate']['percent'] == 50
+    registry.set_candidate_percent('base', 100)
+    pipeline, version = registry.get_versioned('pipeline')
+    assert version == 2 and pipeline.base.path == candidate
+
+
+def test_control_file_carries_actions_to_other_processes(tmp_path):
+    write(tmp_path, 'base.pkl')
+    candidate = write(tmp_path, 'candidate.pkl')
+    control_path = str(tmp_path / 'control.json')
+    local, other = make_registry(tmp_path), make_registry(tmp_path)
+    control, other_control = ModelControl(local, control_path), ModelControl(other, control_path)
+    other.warm_up()
+
+    control.load_candidate('base', candidate, 20)
+    assert other_control.sync() == ['base']
+    assert other.candidate('base') == (candidate, 20)
+    assert other.has_candidate('pipeline')
+    assert other_control.sync() == []
+
+    control.set_candidate_percent('base', 60)
+    other_control.sync()
+    assert other.candidate('base') == (candidate, 60)
+
+    control.promote('base')
+    other_control.sync()
+    assert other.candidate('base') is None
+    assert other.path('base') == candidate
+    assert other.get('pipeline').base.path == candidate
+
+    version = other.stats()['base']['version']
+    control.reload('base')
+    other_control.sync()
+    assert other.stats()['base']['version'] > version
+    assert control.sync() == []
+
+
+def test_reset_forgets_recorded_actions(tmp_path):
+    write(tmp_path, 'base.pkl')
+    candidate = write(tmp_path, 'candidate.pkl')
+    control_path = str(tmp_path / 'control.json')
+    control = ModelControl(make_registry(tmp_path), control_path)
+    control.load_candidate('base', candidate, 20)
+
+    control.reset()
+    fresh = make_registry(tmp_path)
+    assert ModelControl(fresh, control_path).sync() == []
+    assert fresh.candidate('base') is None
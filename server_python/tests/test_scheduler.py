@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pytest
+
+from scheduler import InferenceScheduler
+
+
+class FakePredictor:
+    """Sums each sample and records the size of every batch it sees."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, batch):
+        self.batches.append(len(batch))
+        if self.fail:
+            raise RuntimeError('model exploded')
+        return batch.reshape(len(batch), -1).sum(axis=1)
+
+
+def test_full_batch_runs_without_waiting_for_the_deadline():
+    predictor = FakePredictor()
+    scheduler = InferenceScheduler(predictor, max_batch_size=4, max_wait_ms=5000)
+    started = time.perf_counter()
+    futures = [scheduler.submit(np.full((2, 2), i, dtype=np.float32)) for i in range(4)]
+    assert [future.result(timeout=2) for future in futures] == [0, 4, 8, 12]
+    assert time.perf_counter() - started < 2
+    assert predictor.batches == [4]
+    scheduler.stop(timeout=2)
+
+
+def test_partial_batch_is_flushed_at_the_deadline():
+    predictor = FakePredictor()
+    scheduler = InferenceScheduler(predictor, max_batch_size=8, max_wait_ms=50)
+    started = time.perf_counter()
+    futures = [scheduler.submit(np.ones(3)) for _ in range(2)]
+    assert [future.result(timeout=2) for future in futures] == [3, 3]
+    assert time.perf_counter() - started >= 0.045
+    assert predictor.batches == [2]
+    assert scheduler.stats()['samples'] == 2
+    scheduler.stop(timeout=2)
+
+
+def test_a_failing_batch_fails_every_waiting_future():
+    predictor = FakePredictor(fail=True)
+    scheduler = InferenceScheduler(predictor, max_batch_size=3, max_wait_ms=5000)
+    futures = [scheduler.submit(np.ones(2)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model exploded'):
+            future.result(timeout=2)
+    assert scheduler.stats()['errors'] == 3
+
+    # The worker thread survives and serves the next batch
+    predictor.fail = False
+    scheduler.max_wait = 0.01
+    assert scheduler.predict(np.ones(2), timeout=2) == 2
+    scheduler.stop(timeout=2)
+
+
+def test_samples_of_different_shapes_get_separate_passes():
+    predictor = FakePredictor()
+    scheduler = InferenceScheduler(predictor, max_batch_size=4, max_wait_ms=5000)
+    futures = [scheduler.submit(np.ones(shape)) for shape in ((2,), (3,), (2,), (3,))]
+    assert [future.result(timeout=2) for future in futures] == [2, 3, 2, 3]
+    assert sorted(predictor.batches) == [2, 2]
+    assert scheduler.stats()['recent_batches'] == 1
+    scheduler.stop(timeout=2)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from schema import DIABETES, SEPSIS, Field, Prefilter, Schema, ValidationError
+
+POINT = Schema('point', [Field('x', 'int', 0, 10), Field('y', 'float', -1, 1)])
+
+
+def test_validate_returns_one_row_in_field_order():
+    matrix = POINT.validate({'y': '0.5', 'x': 3.9})
+    assert matrix.shape == (1, 2)
+    assert matrix.tolist() == [[3.0, 0.5]]
+
+
+def test_validate_reports_each_bad_field():
+    with pytest.raises(ValidationError) as info:
+        POINT.validate({'x': 11, 'y': 'abc'})
+    assert info.value.errors == {'x': 'must be between 0 and 10', 'y': "must be a number, got 'abc'"}
+    with pytest.raises(ValidationError) as info:
+        POINT.validate({'y': 0})
+    assert info.value.errors == {'x': 'is required'}
+
+
+def test_validate_rejects_non_objects():
+    with pytest.raises(ValidationError) as info:
+        POINT.validate([1, 2])
+    assert info.value.errors == {'body': 'expected a JSON object'}
+
+
+@pytest.mark.parametrize('value', [[1], [1, 2], {'v': 1}])
+def test_validate_rejects_nested_values(value):
+    with pytest.raises(ValidationError) as info:
+        POINT.validate({'x': value, 'y': [0]})
+    assert set(info.value.errors) == {'x', 'y'}
+
+
+def test_validate_columns_flags_rows_without_dropping_good_ones():
+    columns = {'x': [1, None, 20, '4'], 'y': [0.0, 0.5, 0.5, 'bad']}
+    matrix, errors = POINT.validate_columns(4, columns)
+    assert matrix.shape == (4, 2)
+    assert errors[0] is None
+    assert errors[1] == 'Missing or invalid value for x'
+    assert errors[2] == 'x must be between 0 and 10'
+    assert errors[3] == 'Missing or invalid value for y'
+    assert matrix[0].tolist() == [1.0, 0.0]
+
+
+def test_validate_columns_nested_lists_are_row_errors():
+    # Equal-length nested lists used to build a 2-D column and fail with a 500
+    matrix, errors = POINT.validate_columns(2, {'x': [[1, 2], [3, 4]], 'y': [0, 0]})
+    assert np.isnan(matrix[:, 0]).all()
+    assert errors == ['Missing or invalid value for x'] * 2
+
+    matrix, errors = POINT.validate_columns(2, {'x': [[1], 2], 'y': [0, 0]})
+    assert errors == ['Missing or invalid value for x', None]
+    assert matrix[1, 0] == 2
+
+
+def test_int_fields_truncate_before_the_range_check():
+    matrix, errors = DIABETES.validate_columns(1, {key: [9.9] for key in DIABETES.keys})
+    assert errors == [None]
+    assert matrix[0].tolist() == [9.0] * len(DIABETES.keys)
+    _, errors = POINT.validate_columns(2, {'x': [10.9, 11], 'y': [0, 0]})
+    assert errors == [None, 'x must be between 0 and 10']
+
+
+def test_prefilter_matches_any_rule_on_truncated_values():
+    prefilter = Prefilter(SEPSIS, 'HR>120,Platelets<150', outcome=True)
+    matrix = np.full((3, len(SEPSIS.keys)), 200.0)
+    matrix[:, SEPSIS.index['HR']] = [100, 120.9, 121]
+    matrix[0, SEPSIS.index['Platelets']] = 149.5
+    assert prefilter.matches(matrix).tolist() == [True, False, True]
+
+
+def test_prefilter_empty_rules_match_nothing():
+    prefilter = Prefilter(SEPSIS, '', outcome=True)
+    assert not prefilter.matches(np.zeros((2, len(SEPSIS.keys)))).any()
+
+
+@pytest.mark.parametrize('rules', ['HR=>120', 'Pulse>120', 'HR>high'])
+def test_prefilter_rejects_bad_rules(rules):
+    with pytest.raises(ValueError, match='Invalid sepsis prefilter rule'):
+        Prefilter(SEPSIS, rules, outcome=True)
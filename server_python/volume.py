@@ -0,0 +1,252 @@
+"""Multi-slice MRI volumes: per-slice classification, aggregation and an isosurface.
+
+    python volume.py scan.npy --batch-size 16 > result.json
+
+A volume is a NumPy ``.npy`` stack of shape (slices, rows, cols) or
+(slices, rows, cols, 3), or a multi-page TIFF. ``.npy`` files are memory
+mapped; TIFF pages are decoded one at a time. Only the slices being worked on
+are ever held in memory. Slices are decoded, preprocessed and segmented on a
+thread pool, as /api/analyze does for one image, and classified in fixed-size
+batches by the same CNN. Each slice is reduced to the plot grid as soon as it
+is done, so the isosurface never needs the full-resolution volume.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import plotly.graph_objects as go
+from PIL import Image
+
+import config
+import preprocessing
+from bulk_mri import _predict_fixed, positive_int, tumor_predictor
+
+VOLUME_EXTENSIONS = ('.npy', '.tif', '.tiff')
+AGGREGATES = ('max', 'mean', 'top_k_mean')
+
+
+class NpyVolume:
+    """Slices of a memory-mapped ``.npy`` array, scaled to 8 bits with one volume-wide range."""
+
+    def __init__(self, path):
+        self._array = np.load(path, mmap_mode='r')
+        if not (self._array.ndim == 3 or (self._array.ndim == 4 and self._array.shape[3] in (1, 3))):
+            raise ValueError(f'Expected a (slices, rows, cols[, 3]) array, got shape {self._array.shape}')
+        if self._array.dtype == np.uint8:
+            self._low, self._scale = 0.0, 1.0
+        else:
+            # min/max stream through the mapping page by page; nothing is copied into memory
+            low, high = float(self._array.min()), float(self._array.max())
+            self._low, self._scale = low, 255.0 / (high - low) if high > low else 1.0
+
+    def __len__(self):
+        return self._array.shape[0]
+
+    def __getitem__(self, index):
+        pixels = np.asarray(self._array[index])
+        if pixels.ndim == 3 and pixels.shape[2] == 1:
+            pixels = pixels[:, :, 0]
+        if pixels.dtype != np.uint8:
+            pixels = np.clip((pixels.astype(np.float32) - self._low) * self._scale, 0, 255).astype(np.uint8)
+        return Image.fromarray(pixels)
+
+    def close(self):
+        # Drops the mapping once the last slice view is gone
+        self._array = None
+
+
+class TiffVolume:
+    """Pages of a multi-page TIFF, decoded on demand."""
+
+    def __init__(self, path):
+        self._image = Image.open(path)
+        self._length = getattr(self._image, 'n_frames', 1)
+        # A TIFF file has one read position, so pages are decoded one at a time
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        with self._lock:
+            self._image.seek(index)
+            return self._image.copy()
+
+    def close(self):
+        self._image.close()
+
+
+def open_volume(path):
+    """An indexable volume of PIL slices for a ``.npy`` or TIFF file."""
+    if path.lower().endswith('.npy'):
+        return NpyVolume(path)
+    if path.lower().endswith(('.tif', '.tiff')):
+        return TiffVolume(path)
+    raise ValueError(f'Unsupported volume format; expected one of {", ".join(VOLUME_EXTENSIONS)}')
+
+
+def aggregate(probabilities, method='top_k_mean', top_k=3):
+    """One volume-level score from per-slice probabilities.
+
+    ``top_k_mean`` averages the ``top_k`` most suspicious slices. A tumor
+    shows on a handful of slices, so a plain mean dilutes it, while ``max``
+    follows a single noisy slice.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if method == 'max':
+        return float(probabilities.max())
+    if method == 'mean':
+        return float(probabilities.mean())
+    if method == 'top_k_mean':
+        k = max(1, min(int(top_k), len(probabilities)))
+        return float(np.partition(probabilities, -k)[-k:].mean())
+    raise ValueError(f'aggregate must be one of {", ".join(AGGREGATES)}')
+
+
+def _process_slice(volume, index, grid_size, threshold):
+    """Model input, reduced plot values and tumor statistics for one slice."""
+    img = volume[index]
+    model_input = np.array(img.convert('RGB').resize((224, 224))) / 255.0
+    processed = preprocessing.preprocess_image(img, max_side=config.PREPROCESS_MAX_SIDE)
+    _, tumor_mask = preprocessing.extract_tumor(processed, threshold)
+    # Same highlight as the 2D surface, reduced to the plot grid right away
+    highlighted = np.where(tumor_mask, processed * 1.5, processed)
+    reduced, rows, cols = preprocessing.block_mean(highlighted, grid_size)
+    return model_input, reduced.astype(np.float32), (rows, cols), float(tumor_mask.mean())
+
+
+def _processed_slices(volume, batch_size, workers, grid_size, threshold):
+    """Yield lists of processed slices in order while the next batches process in the background."""
+    window = batch_size * 2
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mri-slice') as pool:
+        pending = deque()
+        submitted = 0
+
+        def fill():
+            nonlocal submitted
+            while len(pending) < window and submitted < len(volume):
+                pending.append(pool.submit(_process_slice, volume, submitted, grid_size, threshold))
+                submitted += 1
+
+        fill()
+        while pending:
+            batch = [pending.popleft().result() for _ in range(min(batch_size, len(pending)))]
+            fill()
+            yield batch
+
+
+def reduce_slices(stack, max_slices):
+    """Area-average a (slices, rows, cols) stack along the slice axis to at most ``max_slices``.
+
+    Returns ``(reduced, slice_centers)``, like ``preprocessing.block_mean`` for 2D.
+    """
+    count = stack.shape[0]
+    factor = math.ceil(count / max_slices) if max_slices else 1
+    starts = np.arange(0, count, factor)
+    ends = np.minimum(starts + factor, count)
+    if factor > 1:
+        reduced = np.add.reduceat(stack, starts, axis=0, dtype=np.float64) / (ends - starts)[:, None, None]
+    else:
+        reduced = stack
+    return reduced, (starts + ends - 1) / 2.0
+
+
+def isosurface_figure(values, slice_centers, row_centers, col_centers, isomin=0.6, decimals=4):
+    """A plotly isosurface of a decimated (slices, rows, cols) volume in original coordinates."""
+    values = np.round(np.asarray(values, dtype=np.float32), decimals)
+    z, y, x = np.meshgrid(slice_centers, row_centers, col_centers, indexing='ij')
+    isomax = float(values.max())
+    fig = go.Figure(data=[go.Isosurface(
+        x=x.ravel().astype(np.float32), y=y.ravel().astype(np.float32), z=z.ravel().astype(np.float32),
+        value=values.ravel(), isomin=min(isomin, isomax), isomax=isomax,
+        surface_count=3, opacity=0.5, colorscale='plasma',
+        caps=dict(x_show=False, y_show=False, z_show=False)
+    )])
+    fig.update_layout(
+        title='3D MRI Volume with Tumor Highlighted',
+        scene=dict(
+            xaxis_title='X (pixels)',
+            yaxis_title='Y (pixels)',
+            zaxis_title='Slice',
+            bgcolor='rgb(240, 240, 240)',
+            camera=dict(eye=dict(x=1.5, y=1.5, z=0.8))
+        ),
+        margin=dict(l=20, r=20, b=20, t=40),
+        autosize=True
+    )
+    return fig
+
+
+def analyze_volume(volume, predict_fn=None, batch_size=16, workers=None, grid_size=48,
+                   threshold=0.6, method='top_k_mean', top_k=3):
+    """Classify every slice and build the isosurface; returns ``(result dict, figure)``.
+
+    Without a ``predict_fn`` every slice goes to one version of the registry's
+    CNN, so a candidate never scores part of a volume; ``model_version`` says which.
+    """
+    if len(volume) == 0:
+        raise ValueError('Volume has no slices')
+    for option, value in (('batch_size', batch_size), ('grid', grid_size), ('top_k', top_k)):
+        if value < 1:
+            raise ValueError(f'{option} must be at least 1')
+    version = None
+    if predict_fn is None:
+        predict_fn, version = tumor_predictor()
+    workers = workers or os.cpu_count() or 1
+    probabilities, fractions, reduced, axes = [], [], [], None
+    for batch in _processed_slices(volume, batch_size, workers, grid_size, threshold):
+        if axes is None:
+            axes = batch[0][2]
+        for _, plane, _, fraction in batch:
+            if reduced and plane.shape != reduced[0].shape:
+                raise ValueError('All slices must have the same size')
+            reduced.append(plane)
+            fractions.append(fraction)
+        inputs = [model_input for model_input, _, _, _ in batch]
+        probabilities.extend(float(p) for p in _predict_fixed(predict_fn, inputs, batch_size))
+
+    values, slice_centers = reduce_slices(np.stack(reduced), grid_size)
+    figure = isosurface_figure(values, slice_centers, *axes, isomin=threshold, decimals=config.SURFACE_DECIMALS)
+    score = aggregate(probabilities, method, top_k)
+    result = {
+        'slices': len(probabilities),
+        'probabilities': probabilities,
+        'tumor_fraction': fractions,
+        'volume_score': score,
+        'aggregate': method,
+        'detected': score > 0.5,
+        'peak_slice': int(np.argmax(probabilities)),
+        'grid': list(values.shape),
+        'model_version': version,
+    }
+    return result, figure
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='.npy or multi-page TIFF volume')
+    parser.add_argument('--batch-size', type=positive_int, default=config.VOLUME_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=config.VOLUME_WORKERS or None, help='slice threads')
+    parser.add_argument('--grid', type=positive_int, default=config.VOLUME_GRID_SIZE, help='isosurface points per axis')
+    parser.add_argument('--aggregate', choices=AGGREGATES, default=config.VOLUME_AGGREGATE)
+    parser.add_argument('--top-k', type=positive_int, default=config.VOLUME_TOP_K)
+    parser.add_argument('--plot', help='also write the isosurface figure JSON here')
+    args = parser.parse_args(argv)
+
+    result, figure = analyze_volume(open_volume(args.path), batch_size=args.batch_size, workers=args.workers,
+                                    grid_size=args.grid, method=args.aggregate, top_k=args.top_k)
+    json.dump(result, sys.stdout)
+    sys.stdout.write('\n')
+    if args.plot:
+        with open(args.plot, 'w') as f:
+            f.write(figure.to_json())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""WSGI entry point for production serving: ``gunicorn wsgi:app`` (settings in gunicorn.conf.py)."""
+from app import app
+import serving
+
+# With preload_app this runs once in the gunicorn master, before the workers fork
+serving.preload()